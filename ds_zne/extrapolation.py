@@ -0,0 +1,197 @@
+"""Batched zero-noise extrapolation of whole (trial x distance x scale factor) arrays.
+
+The processing notebooks extrapolate one trial and one distance at a time with `zne.PolyFactory`.
+Here every fit is a weighted sum of the expectation values: the weights are the intercept row of
+the pseudo-inverse of the design matrix, which is computed once per set of scale factors and
+cached. A whole array is extrapolated with a single multiply-and-sum, so trying other models,
+orders or scale-factor subsets takes milliseconds:
+
+    from extrapolation import D_ARRAY, distance_windows, extrapolate, load_data, summarize
+
+    exp_vals = load_data(depth=20)                                          # trial x column x distance
+    folding = extrapolate(exp_vals[:, :4, :6].swapaxes(1, 2), [1, 3, 5, 7])  # trial x distance
+    values, scale_factors = distance_windows(exp_vals[:, 0, :], D_ARRAY, p_err=0.006)
+    ds = extrapolate(values, scale_factors, model="exp", asymptote=0.25)    # trial x window
+    mean, std, error = summarize(ds)
+
+The results agree with `PolyFactory`, `RichardsonFactory` and `ExpFactory(asymptote=...)` of Mitiq.
+"""
+import functools
+import os
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from pauli_propagation import gen_noise_model
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEEP_CIRCS_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deep_circs_data")
+
+# Code distances of `data/` and `deep_circs_data/`, as in the processing notebooks.
+D_ARRAY = [21, 19, 17, 15, 13, 11, 9, 7, 5]
+DEEP_CIRCS_D_ARRAY = np.linspace(27, 5, 12, dtype=int).tolist()
+
+MODELS = ["poly", "richardson", "exp"]
+
+
+class Summary(NamedTuple):
+    """Statistics over trials of zero-noise values."""
+    mean: np.ndarray
+    # Standard deviation over trials, as plotted in the notebooks.
+    std: np.ndarray
+    # Bootstrap standard error of the mean.
+    error: np.ndarray
+
+
+def polynomial_weights(scale_factors: Sequence[float], order: int) -> np.ndarray:
+    """Weights `w` such that `w @ y` is the zero-noise limit of a least-squares polynomial fit of `y`."""
+    return _design_pinv(tuple(float(s) for s in scale_factors), order)[0]
+
+
+def extrapolate(
+    values: np.ndarray,
+    scale_factors: Sequence[float],
+    model: str = "poly",
+    order: int = 3,
+    asymptote: Optional[float] = None,
+    eps: float = 1.0e-6,
+) -> np.ndarray:
+    """Zero-noise limits of a batch of fits, one per row along the last axis of `values`.
+
+    Args:
+        values: Expectation values, with the scale factors along the last axis.
+        scale_factors: Scale factors, either shared by all fits or one set per fit (broadcast
+            against `values`, e.g. one set per DS-ZNE window).
+        model: "poly" (least-squares polynomial of the given order), "richardson" (polynomial
+            through all points) or "exp" (asymptote + sign * exp(polynomial of the given order),
+            fitted in log space like Mitiq's `ExpFactory`/`PolyExpFactory`).
+        order: Order of the polynomial of the "poly" and "exp" models.
+        asymptote: Infinite-noise limit of the "exp" model, e.g. 0.25 for two-qubit RB.
+        eps: Smallest value of `sign * (values - asymptote)` before taking the log ("exp" model).
+    Returns:
+        Array of shape `values.shape[:-1]`.
+    """
+    values = np.asarray(values, dtype=float)
+    scale_factors = np.broadcast_to(np.asarray(scale_factors, dtype=float), values.shape)
+    if model == "richardson":
+        model, order = "poly", values.shape[-1] - 1
+
+    # Fits sharing a set of scale factors share their design matrix.
+    unique, inverse = np.unique(scale_factors.reshape(-1, values.shape[-1]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(values.shape[:-1])
+
+    if model == "poly":
+        weights = np.stack([polynomial_weights(s, order) for s in unique])
+        return np.sum(weights[inverse] * values, axis=-1)
+
+    if model == "exp":
+        if asymptote is None:
+            raise ValueError("The exponential model requires an asymptote.")
+        # The sign of the exponential comes from the intercept of a linear fit.
+        linear = np.stack([polynomial_weights(s, 1) for s in unique])
+        sign = np.sign(np.sum(linear[inverse] * values, axis=-1) - asymptote)[..., np.newaxis]
+        shifted = np.maximum(sign * (values - asymptote), eps)
+        # Weighted least squares in log space, with the same weights as Mitiq.
+        w = np.sqrt(shifted)
+        design = np.stack([_vandermonde(tuple(s), order) for s in unique])[inverse]
+        coeffs = np.linalg.pinv(w[..., np.newaxis] * design) @ (w * np.log(shifted))[..., np.newaxis]
+        return asymptote + sign[..., 0] * np.exp(coeffs[..., 0, 0])
+
+    raise ValueError(f"Unknown model {model}, expected one of {MODELS}.")
+
+
+def summarize(zne_values: np.ndarray, axis: int = 0, num_bootstrap: int = 1000, seed: Optional[int] = 0) -> Summary:
+    """Mean and standard deviation over trials, and bootstrap error bars of the mean.
+
+    Trials are resampled with replacement `num_bootstrap` times, all at once.
+    """
+    zne_values = np.moveaxis(np.asarray(zne_values, dtype=float), axis, 0)
+    num_trials = zne_values.shape[0]
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, num_trials, size=(num_bootstrap, num_trials))
+    bootstrap_means = zne_values[samples].mean(axis=1)
+    return Summary(zne_values.mean(axis=0), zne_values.std(axis=0), bootstrap_means.std(axis=0))
+
+
+def distance_windows(
+    values: np.ndarray,
+    distances: Sequence[int],
+    p_err: float,
+    p_th: float = 0.009,
+    size: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    """DS-ZNE data: windows of `size` consecutive distances and their noise scale factors.
+
+    Args:
+        values: Expectation values with the distances along the last axis, largest distance first.
+        distances: Code distances, e.g. `D_ARRAY`.
+        p_err: Physical error rate.
+        p_th: Threshold error rate.
+        size: Number of distances per extrapolation, 4 in the notebooks.
+    Returns:
+        Values of shape `(..., num_windows, size)` and scale factors of shape `(num_windows, size)`,
+        relative to the largest distance of each window. The windows of the notebooks'
+        `distance_indices` are `[0, 1, 2, 3], [1, 2, 3, 4], ...`.
+    """
+    error_rates = np.array([gen_noise_model(p_err, d, p_th) for d in distances])
+    windows = np.lib.stride_tricks.sliding_window_view(np.asarray(values, dtype=float), size, axis=-1)
+    rate_windows = np.lib.stride_tricks.sliding_window_view(error_rates, size)
+    return windows, rate_windows / rate_windows[:, :1]
+
+
+def load_data(depth: int, data_dir: str = DATA_DIR, distances: Sequence[int] = D_ARRAY) -> np.ndarray:
+    """Array `(trial, column, distance)` of `data/depth{depth}_distance{distance}.txt`.
+
+    The columns are `sweep.SCALED_COLUMNS`: folding at scale factors 1, 3, 5, 7 and the unscaled
+    circuit with 4x shots. Distances saved with only `sweep.UNSCALED_COLUMNS` have NaN at scale
+    factors 3, 5 and 7.
+    """
+    files = [np.loadtxt(os.path.join(data_dir, f"depth{depth}_distance{d}.txt"), ndmin=2) for d in distances]
+    out = np.full((files[0].shape[0], 5, len(distances)), np.nan)
+    for d_ind, exp_vals in enumerate(files):
+        if exp_vals.shape[1] == 5:
+            out[:, :, d_ind] = exp_vals
+        else:
+            out[:, [0, 4], d_ind] = exp_vals
+    return out
+
+
+def load_deep_circs_data(
+    depth: int,
+    data_dir: str = DEEP_CIRCS_DATA_DIR,
+    distances: Sequence[int] = DEEP_CIRCS_D_ARRAY,
+    num_windows: int = 9,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """DS-ZNE, unmitigated and folding arrays of `deep_circs_data/` for one circuit depth.
+
+    Returns:
+        `(trial, distance)` values at each distance, `(trial, distance)` unmitigated values of the
+        largest `num_windows` distances, and `(trial, scale factor, distance)` folding values at
+        scale factors 1, 3, 5, 7 of those distances, as `raw_folding_depth*` in the notebook.
+    """
+    ds = np.loadtxt(os.path.join(data_dir, f"ds_depth{depth}.txt"), ndmin=2)
+    unmitigated = np.loadtxt(os.path.join(data_dir, f"unmit_depth{depth}.txt"), ndmin=2)
+    folding = np.stack(
+        [np.loadtxt(os.path.join(data_dir, f"folding_depth{depth}_d{d}"), ndmin=2) for d in distances[:num_windows]],
+        axis=-1,
+    )
+    folding = np.concatenate([ds[:, np.newaxis, :num_windows], folding], axis=1)
+    return ds, unmitigated, folding
+
+
+@functools.lru_cache(maxsize=None)
+def _vandermonde(scale_factors: tuple[float, ...], order: int) -> np.ndarray:
+    """Design matrix of a polynomial fit, with columns 1, x, x^2, ..."""
+    design = np.vander(np.array(scale_factors), order + 1, increasing=True)
+    design.setflags(write=False)
+    return design
+
+
+@functools.lru_cache(maxsize=None)
+def _design_pinv(scale_factors: tuple[float, ...], order: int) -> np.ndarray:
+    if order + 1 > len(scale_factors):
+        raise ValueError(f"A fit of order {order} needs more than {len(scale_factors)} scale factors.")
+    pinv = np.linalg.pinv(_vandermonde(scale_factors, order))
+    pinv.setflags(write=False)
+    return pinv
@@ -0,0 +1,242 @@
+"""Parallel, resumable (distance, trial, scaling technique) sweep for DS-ZNE data generation.
+
+Every cell of the sweep gets its own random seed derived from a master seed and the cell's
+coordinates, so results do not depend on the number of workers or the order in which cells
+finish. Finished cells are appended to a checkpoint file as soon as they are available, and an
+interrupted sweep picks up where it stopped when run again with the same checkpoint file.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+
+import cirq
+import numpy as np
+from mitiq.zne.scaling import fold_global
+
+from pauli_propagation import distance_scaled_execute
+
+
+class Technique(NamedTuple):
+    """Noise scaling technique: unitary folding scale factor and multiplier of the shot budget."""
+    scale_factor: int
+    shots_multiplier: int = 1
+
+
+# Columns of `data/depth{depth}_distance{distance}.txt` for the scaled distances: unitary folding
+# at scale factors 1, 3, 5, 7 and the unscaled circuit with 4x shots.
+SCALED_COLUMNS = [Technique(1), Technique(3), Technique(5), Technique(7), Technique(1, 4)]
+# Columns of `data/depth{depth}_distance{distance}.txt` for the three smallest distances.
+UNSCALED_COLUMNS = [Technique(1), Technique(1, 4)]
+# Columns of `deep_circs_data/folding_depth{depth}_d{distance}`.
+FOLDING_COLUMNS = [Technique(3), Technique(5), Technique(7)]
+
+Cell = tuple[int, int, Technique]
+
+
+def scale_shots(num_device_qubits: int, scaled_distance: int, base_shots: int, n_qubits_circuit: int) -> int:
+    """Shots for executions parallelized over the qubits left free at a given code distance."""
+    used_qubits = n_qubits_circuit * scaled_distance ** 2
+    return base_shots * int(num_device_qubits / used_qubits)
+
+
+def cell_seed(master_seed: int, cell: Cell) -> np.random.SeedSequence:
+    """Seed of a single cell, derived from the master seed and the cell's coordinates."""
+    distance, trial, technique = cell
+    return np.random.SeedSequence(
+        master_seed, spawn_key=(distance, trial, technique.scale_factor, technique.shots_multiplier)
+    )
+
+
+def run_sweep(
+    circuits: list[cirq.Circuit],
+    cells: list[Cell],
+    p_err: float,
+    base_shots: int,
+    device_size: int,
+    checkpoint_path: str,
+    master_seed: int,
+    idle_noise_rounds: int = 2,
+    max_workers: Optional[int] = None,
+) -> dict[Cell, float]:
+    """Run all cells of a sweep over a process pool, resuming from `checkpoint_path` if it exists.
+
+    Cells that share a circuit (same trial and scale factor) are run in the same task, so the
+    Pauli propagation of the circuit is reused for every distance and shot budget.
+
+    Args:
+        circuits: RB circuits, one per trial.
+        cells: (distance, trial, technique) cells to compute, e.g. from `grid`.
+        p_err: Physical error rate.
+        base_shots: Shots per execution before scaling with the code distance.
+        device_size: Number of physical qubits of the device.
+        checkpoint_path: Text file to which finished cells are appended.
+        master_seed: Seed from which the seed of each cell is derived.
+        idle_noise_rounds: Noise rounds on idle qubits (see `pauli_propagation.propagate_observable`).
+        max_workers: Number of worker processes (defaults to the number of CPUs).
+    Returns:
+        Expectation value of each cell.
+    """
+    n_qubits = len(circuits[0].all_qubits())
+    header = (
+        f"# master_seed={master_seed} p_err={p_err} base_shots={base_shots} device_size={device_size} "
+        f"n_qubits={n_qubits} idle_noise_rounds={idle_noise_rounds} "
+        f"circuits={circuits_fingerprint(circuits)}\n"
+    )
+    results = load_checkpoint(checkpoint_path, header)
+    if os.path.exists(checkpoint_path):
+        # Drop the partial last line of an interrupted run, so the next record starts on its own line.
+        _truncate_to_last_line(checkpoint_path)
+    else:
+        with open(checkpoint_path, "w") as file:
+            file.write(header)
+
+    tasks = {}
+    for cell in cells:
+        if cell not in results:
+            distance, trial, technique = cell
+            tasks.setdefault((trial, technique.scale_factor), []).append(cell)
+    print(f"{len(results)} cells loaded from checkpoint, {sum(map(len, tasks.values()))} cells to run.")
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(circuits, p_err, base_shots, device_size, master_seed, idle_noise_rounds),
+    ) as pool, open(checkpoint_path, "a") as file:
+        futures = [pool.submit(_run_cells, task_cells) for task_cells in tasks.values()]
+        for done, future in enumerate(as_completed(futures), start=1):
+            for cell, value in future.result():
+                distance, trial, technique = cell
+                file.write(f"{distance} {trial} {technique.scale_factor} {technique.shots_multiplier} {value!r}\n")
+                results[cell] = value
+            file.flush()
+            if done in np.linspace(0, len(futures), 11, dtype=int):
+                print(f"    Finished {done} of {len(futures)} tasks")
+
+    return results
+
+
+def load_checkpoint(checkpoint_path: str, header: Optional[str] = None) -> dict[Cell, float]:
+    """Read the finished cells of a sweep, checking that it was run with the same settings."""
+    results = {}
+    if not os.path.exists(checkpoint_path):
+        return results
+
+    with open(checkpoint_path) as file:
+        first_line = file.readline()
+        if header is not None and first_line != header:
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} was written with different settings: {first_line.strip()}"
+            )
+        for line in file:
+            fields = line.split()
+            # Skip a partially written last line of an interrupted run: every record ends with a newline.
+            if not line.endswith("\n") or len(fields) != 5:
+                continue
+            distance, trial, scale_factor, shots_multiplier = map(int, fields[:4])
+            results[(distance, trial, Technique(scale_factor, shots_multiplier))] = float(fields[4])
+    return results
+
+
+def circuits_fingerprint(circuits: list[cirq.Circuit]) -> str:
+    """Hash of the circuits of a sweep, so a checkpoint is not resumed with regenerated circuits."""
+    digest = hashlib.sha256()
+    for circuit in circuits:
+        digest.update(hashlib.sha256(repr(circuit).encode()).digest())
+    return digest.hexdigest()[:16]
+
+
+def grid(distances: list[int], num_trials: int, techniques: list[Technique]) -> list[Cell]:
+    """All cells of a (distance, trial, technique) grid."""
+    return [(d, trial, t) for d in distances for trial in range(num_trials) for t in techniques]
+
+
+def to_array(
+    results: dict[Cell, float],
+    distances: list[int],
+    num_trials: int,
+    techniques: list[Technique],
+) -> np.ndarray:
+    """Arrange results as `(trial, technique, distance)`, like `trial_results` in the notebooks."""
+    array = np.full((num_trials, len(techniques), len(distances)), np.nan)
+    for d_ind, distance in enumerate(distances):
+        for trial in range(num_trials):
+            for t_ind, technique in enumerate(techniques):
+                array[trial, t_ind, d_ind] = results.get((distance, trial, technique), np.nan)
+    return array
+
+
+def export_distance_files(
+    results: dict[Cell, float],
+    distances: list[int],
+    num_trials: int,
+    techniques: list[Technique],
+    path_template: str,
+) -> None:
+    """Write one `trial x technique` text file per distance.
+
+    For example, `path_template="data/depth20_distance{distance}.txt"` with `SCALED_COLUMNS` or
+    `UNSCALED_COLUMNS`, or `"deep_circs_data/folding_depth100_d{distance}"` with `FOLDING_COLUMNS`.
+    """
+    array = to_array(results, distances, num_trials, techniques)
+    for d_ind, distance in enumerate(distances):
+        np.savetxt(path_template.format(distance=distance), array[:, :, d_ind])
+
+
+def export_distance_matrix(
+    results: dict[Cell, float],
+    distances: list[int],
+    num_trials: int,
+    technique: Technique,
+    path: str,
+) -> None:
+    """Write a single `trial x distance` text file, e.g. `deep_circs_data/ds_depth100.txt`."""
+    np.savetxt(path, to_array(results, distances, num_trials, [technique])[:, 0, :])
+
+
+# State of each worker process, set once by `_init_worker`.
+_WORKER = {}
+
+
+def _init_worker(circuits, p_err, base_shots, device_size, master_seed, idle_noise_rounds):
+    _WORKER.update(
+        circuits=circuits,
+        p_err=p_err,
+        base_shots=base_shots,
+        device_size=device_size,
+        master_seed=master_seed,
+        idle_noise_rounds=idle_noise_rounds,
+    )
+
+
+def _truncate_to_last_line(path: str) -> None:
+    with open(path, "rb+") as file:
+        data = file.read()
+        file.truncate(data.rfind(b"\n") + 1)
+
+
+def _run_cells(cells: list[Cell]) -> list[tuple[Cell, float]]:
+    circuits = _WORKER["circuits"]
+    n_qubits = len(circuits[0].all_qubits())
+    correct_bitstring = [0] * n_qubits
+
+    _, trial, technique = cells[0]
+    folded = fold_global(circuits[trial], technique.scale_factor)
+
+    values = []
+    for cell in cells:
+        distance, _, technique = cell
+        shots = scale_shots(
+            _WORKER["device_size"], distance, technique.shots_multiplier * _WORKER["base_shots"], n_qubits
+        )
+        value = distance_scaled_execute(
+            folded,
+            distance,
+            _WORKER["p_err"],
+            shots,
+            correct_bitstring,
+            rng=np.random.default_rng(cell_seed(_WORKER["master_seed"], cell)),
+            idle_noise_rounds=_WORKER["idle_noise_rounds"],
+        )
+        values.append((cell, value))
+    return values
@@ -0,0 +1,65 @@
+"""Tests of the Pauli-propagation executor against the density-matrix executor of the notebooks."""
+import cirq
+import numpy as np
+import pytest
+from mitiq.benchmarks import generate_rb_circuits
+from mitiq.zne.scaling import fold_global
+
+from pauli_propagation import noisy_execute
+
+
+class PauliNoiseModel(cirq.NoiseModel):
+    """`PauliNoiseModel` of `ds-zne-data-generation.ipynb`."""
+
+    def __init__(self, error_rate):
+        self.error_rate = error_rate
+
+    def noisy_operation(self, op):
+        channel = cirq.BitFlipChannel(self.error_rate).on_each(op.qubits)
+        channel += cirq.PhaseFlipChannel(self.error_rate).on_each(op.qubits)
+        return [op, channel]
+
+
+def reference_noisy_execute(circ, noise_level, correct_bitstring):
+    """Exact ⟨A⟩ of `noisy_execute` in `ds-zne-data-generation.ipynb`, without shot noise."""
+    qubits = circ.all_qubits()
+    copy = cirq.Circuit()
+    for moment in circ.moments:
+        idle = False
+        for q in qubits:
+            if not moment.operates_on_single_qubit(q):
+                idle = True
+                op_to_circ = cirq.Circuit(PauliNoiseModel(noise_level).noisy_operation(cirq.I(q)))
+                merged_op = cirq.merge_operations_to_circuit_op(op_to_circ, lambda op1, op2: True)
+                copy.append(moment.with_operations(merged_op.all_operations()))
+                break
+        if not idle:
+            copy.append(moment)
+    noisy_circ = copy.with_noise(PauliNoiseModel(noise_level))
+    rho = cirq.DensityMatrixSimulator().simulate(noisy_circ, qubit_order=sorted(qubits)).final_density_matrix
+    index = int("".join(map(str, correct_bitstring)), 2)
+    return float(np.real(rho[index, index]))
+
+
+@pytest.mark.parametrize("n_qubits", [2, 3])
+def test_matches_density_matrix_simulation(n_qubits):
+    rng = np.random.default_rng(0)
+    qubits = cirq.LineQubit.range(n_qubits)
+    # Random Clifford circuits with idle qubits in most moments.
+    circuits = [fold_global(circ, 3) for circ in generate_rb_circuits(2, 2, trials=2, seed=1)]
+    for _ in range(3):
+        circ = cirq.Circuit()
+        for _ in range(6):
+            a, b = rng.choice(n_qubits, size=2, replace=False)
+            gate = [cirq.CNOT, cirq.CZ, cirq.SWAP][rng.integers(3)]
+            circ.append(cirq.Moment(gate(qubits[a], qubits[b])))
+            circ.append(cirq.Moment([cirq.H, cirq.S, cirq.X][rng.integers(3)](qubits[rng.integers(n_qubits)])))
+        circuits.append(circ)
+
+    for circ in circuits:
+        if len(circ.all_qubits()) != n_qubits:
+            continue
+        for correct_bitstring in [[0] * n_qubits, [1] + [0] * (n_qubits - 1)]:
+            for noise_level in [0.01, 0.1]:
+                expected = reference_noisy_execute(circ, noise_level, correct_bitstring)
+                assert noisy_execute(circ, noise_level, None, correct_bitstring) == pytest.approx(expected, abs=1e-6)
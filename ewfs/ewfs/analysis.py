@@ -0,0 +1,116 @@
+"""Extended Wigner's friend scenario (EWFS) analysis: settings, decoding and inequalities.
+
+This module only depends on NumPy, so post-processing saved results (`file_io.load_experiments`,
+`compute_violations`, `plot.plot_results`) does not import Qiskit. The circuits are built by
+`ewfs.ewfs`, which re-exports everything defined here.
+"""
+from enum import Enum
+import os
+
+import numpy as np
+
+
+DATA_PATH = os.path.join("..", "data")
+
+
+# Settings for extended Wigner's friend scenario.
+class Setting(Enum):
+    PEEK = 1
+    REVERSE_1 = 2
+    REVERSE_2 = 3
+
+
+# Observers for scenario are Alice and Bob.
+class Observer(Enum):
+    ALICE = 0
+    BOB = 1
+
+
+# Experiment settings (peek, reverse_1, and reverse_2).
+PEEK = Setting.PEEK.value
+REVERSE_1 = Setting.REVERSE_1.value
+REVERSE_2 = Setting.REVERSE_2.value
+SETTINGS = [PEEK, REVERSE_1, REVERSE_2]
+
+# "Super"-observers (Alice and Bob).
+ALICE = Observer.ALICE.value
+BOB = Observer.BOB.value
+OBSERVERS = [ALICE, BOB]
+
+# Angles and beta term used for Alice and Bob measurement operators from arXiv:1907.05607.
+# Note that despite the fact that degrees are used, we need to convert this to radians.
+# ANGLES = {PEEK: np.deg2rad(168), REVERSE_1: np.deg2rad(0), REVERSE_2: np.deg2rad(118)}
+# BETA = np.deg2rad(175)
+
+# Optimized angles (refer to paper).
+ANGLES = {PEEK: np.deg2rad(40), REVERSE_1: np.deg2rad(230), REVERSE_2: np.deg2rad(310)}
+BETA = np.deg2rad(220)
+
+
+def decode_results(results: dict, charlie_size: int, debbie_size: int = 1) -> dict[str, float]:
+    """Take majority vote of measurement bit-strings."""
+    decoded_results = {}
+
+    # For each setting, there is a dictionary of measurement results.
+    for setting in results:
+        if setting == (PEEK, REVERSE_1) or setting == (PEEK, REVERSE_2):
+            # Debbie's size is 1 because no PEEK setting
+            debbie_size = 1
+
+            setting_results = {}
+            # Decode the keys for each measurement result of the setting.
+            for k, v in results[setting].items():
+                alice_friend, bob_friend = k[:charlie_size], k[-debbie_size:]
+
+                alice_zero_count, bob_zero_count = alice_friend.count("0"), bob_friend.count("0")
+
+                alice_decoding = "0" if alice_zero_count >= charlie_size // 2 + 1 else "1"
+                bob_decoding = "0" if bob_zero_count >= 1 else "1"
+
+                if alice_decoding + bob_decoding in setting_results.keys():
+                    setting_results[alice_decoding + bob_decoding] += v
+                else:
+                    setting_results[alice_decoding + bob_decoding] = v
+            decoded_results[setting] = setting_results
+        else:
+            decoded_results[setting] = results[setting]
+
+    return decoded_results
+
+
+def double_expect(settings: tuple[int, int], results: dict) -> float:
+    """Expectation value of product of two operators."""
+    probs = results[settings]
+    # <AB> = P(00) - P(01) - P(10) + P(11)
+    return probs.get("00", 0) - probs.get("01", 0) - probs.get("10", 0) + probs.get("11", 0)
+
+
+def calculate_branch_factor(friend_size: int) -> float:
+    assert friend_size > 0, "Friend size must be a positive integer."
+    return friend_size - 1
+
+
+def compute_inequalities(results, verbose=False) -> dict[str, float]:
+    """Compute the semi-Brukner inequalities."""
+    A1B2 = double_expect((PEEK, REVERSE_1), results)
+    A1B3 = double_expect((PEEK, REVERSE_2), results)
+
+    A3B2 = double_expect((REVERSE_2, REVERSE_1), results)
+    A3B3 = double_expect((REVERSE_2, REVERSE_2), results)
+
+    # Eq. (18) from [1].
+    semi_brukner = -A1B2 + A1B3 - A3B2 - A3B3 - 2
+
+    if verbose:
+        print(f"{semi_brukner=} -- is violated: {semi_brukner > 0}")
+
+    return {"semi_brukner": semi_brukner}
+
+
+def compute_violations(results: dict, charlie_size: int, debbie_size: int, strategy: str, verbose: bool = False) -> dict[str, float]:
+    """Compute violation values based on strategy."""
+    if strategy == "random":
+        return compute_inequalities(results=results, verbose=verbose)
+    elif strategy == "majority_vote":
+        return compute_inequalities(decode_results(results=results, charlie_size=charlie_size, debbie_size=debbie_size), verbose=verbose)
+    raise ValueError(f"Strategy: {strategy} not defined.")
@@ -0,0 +1,360 @@
+"""Noise-aware optimization of the EWFS measurement angles (`ANGLES` and `BETA`)."""
+import functools
+import json
+from typing import NamedTuple
+
+import numpy as np
+
+from .analysis import PEEK, REVERSE_1, REVERSE_2
+
+
+# Noise models of `ewfs.noise_models` that can be folded into the analytic evaluation.
+NOISE_MODELS = ["bitflip", "depolarizing"]
+
+# Pauli errors are stored as (probability, x, z), with bit q of x (z) set if the error has an
+# X (Z) component on qubit q.
+PauliErrors = list[tuple[float, int, int]]
+
+
+class OptimizedAngles(NamedTuple):
+    """Measurement angles in the format taken by `ewfs()`, and the semi-Brukner value they reach."""
+    angles: dict[int, float]
+    beta: float
+    semi_brukner: float
+
+
+def semi_brukner(
+    candidates: np.ndarray,
+    friend_size: int,
+    noise: str | None = None,
+    p: float = 0.0,
+    strategy: str = "majority_vote",
+    debbie_size: int = 1,
+) -> np.ndarray:
+    """Exact semi-Brukner value of `compute_violations` for a batch of angle candidates.
+
+    The circuits of `ewfs()` are evaluated analytically: the friends' CNOT ladders are Clifford, so
+    the Pauli errors of the noise model are propagated through them once, leaving an effective
+    two-qubit problem of Alice's and Bob's qubits that is evaluated for all candidates with NumPy.
+    Noise is placed as in circuits transpiled with `optimization_level=0` to the basis gates of the
+    noise model: after every `h`, `x` and `cx` gate and, for bit flips, before every measurement,
+    while `rz` gates are noiseless.
+
+    Args:
+        candidates: Array of shape `(..., 4)` with the angles of PEEK, REVERSE_1 and REVERSE_2 and
+            beta, in radians.
+        friend_size: Number of qubits of Alice's friend (Charlie).
+        noise: One of `NOISE_MODELS`, or `None` for a noiseless simulation.
+        p: Strength of the noise model (flip probability or depolarizing error rate).
+        strategy: Either "majority_vote" or "random".
+        debbie_size: Number of qubits of Bob's friend (Debbie).
+    Returns:
+        The semi-Brukner value of each candidate, of shape `candidates.shape[:-1]`.
+    """
+    candidates = np.asarray(candidates, dtype=float)
+    peek, reverse_1, reverse_2, beta = np.moveaxis(candidates, -1, 0)
+    factors = _noise_factors(friend_size, debbie_size, noise, float(p), strategy)
+
+    alice = {
+        PEEK: _peek_vector(peek, factors["charlie_peek"], factors["one_qubit"]),
+        REVERSE_2: _reverse_vector(peek, reverse_2, factors, "charlie_reverse"),
+    }
+    bob = {
+        REVERSE_1: _reverse_vector(beta - peek, beta - reverse_1, factors, "debbie_reverse"),
+        REVERSE_2: _reverse_vector(beta - peek, beta - reverse_2, factors, "debbie_reverse"),
+    }
+
+    def expect(alice_setting: int, bob_setting: int) -> np.ndarray:
+        # Single-qubit marginals of the singlet vanish, so only the correlation tensor contributes.
+        return np.sum(_scale(alice[alice_setting], factors["correlations"]) * bob[bob_setting], axis=0)
+
+    # Eq. (18) from [1], as in `compute_inequalities`.
+    return -expect(PEEK, REVERSE_1) + expect(PEEK, REVERSE_2) - expect(REVERSE_2, REVERSE_1) - expect(REVERSE_2, REVERSE_2) - 2
+
+
+def optimize_angles(
+    friend_size: int,
+    noise: str | None = None,
+    p: float = 0.0,
+    strategy: str = "majority_vote",
+    debbie_size: int = 1,
+    num_candidates: int = 10_000,
+    num_refined: int = 16,
+    num_steps: int = 200,
+    seed: int | None = None,
+) -> OptimizedAngles:
+    """Angles maximizing the semi-Brukner value for a noise level and friend size.
+
+    A batch of random candidates is evaluated at once with `semi_brukner`, and the best ones are
+    refined together by gradient ascent with central finite differences.
+
+    Args:
+        friend_size: Number of qubits of Alice's friend (Charlie).
+        noise: One of `NOISE_MODELS`, or `None` for a noiseless simulation.
+        p: Strength of the noise model.
+        strategy: Either "majority_vote" or "random".
+        debbie_size: Number of qubits of Bob's friend (Debbie).
+        num_candidates: Number of random candidates.
+        num_refined: Number of best candidates refined by gradient ascent.
+        num_steps: Number of gradient ascent steps.
+        seed: Seed of the random candidates.
+    Returns:
+        The best angles found.
+    """
+    evaluate = functools.partial(
+        semi_brukner, friend_size=friend_size, noise=noise, p=p, strategy=strategy, debbie_size=debbie_size
+    )
+    rng = np.random.default_rng(seed)
+    candidates = rng.uniform(0, 2 * np.pi, size=(num_candidates, 4))
+    values = evaluate(candidates)
+    best = np.argsort(values)[-num_refined:]
+    x, values = candidates[best], values[best]
+
+    # Batched gradient ascent, halving the step of each candidate whenever it does not improve.
+    h = 1e-6
+    shifts = h * np.eye(4)
+    step = np.full(len(x), 0.1)
+    for _ in range(num_steps):
+        shifted = evaluate(np.stack([x[:, None, :] + shifts, x[:, None, :] - shifts]))
+        gradient = (shifted[0] - shifted[1]) / (2 * h)
+        proposal = x + step[:, None] * gradient
+        proposal_values = evaluate(proposal)
+        improved = proposal_values > values
+        x[improved], values[improved] = proposal[improved], proposal_values[improved]
+        step = np.where(improved, step * 1.2, step / 2)
+
+    peek, reverse_1, reverse_2, beta = np.mod(x[np.argmax(values)], 2 * np.pi)
+    return OptimizedAngles(
+        angles={PEEK: float(peek), REVERSE_1: float(reverse_1), REVERSE_2: float(reverse_2)},
+        beta=float(beta),
+        semi_brukner=float(np.max(values)),
+    )
+
+
+def angle_table(
+    ps: list[float],
+    friend_sizes: list[int],
+    noise: str | None = None,
+    **kwargs,
+) -> dict[tuple[float, int], OptimizedAngles]:
+    """Optimized angles for each `(p, friend_size)`, see `optimize_angles` for the keyword arguments.
+
+    For example, `table = angle_table([0.01, 0.03], range(1, 9), noise="bitflip")` and then
+    `ewfs(alice, bob, "majority_vote", table[0.03, 3].angles, table[0.03, 3].beta, 3)`.
+    """
+    return {
+        (p, friend_size): optimize_angles(friend_size, noise=noise, p=p, **kwargs)
+        for p in ps
+        for friend_size in friend_sizes
+    }
+
+
+def save_angle_table(table: dict[tuple[float, int], OptimizedAngles], path: str) -> None:
+    """Writes an angle table to a JSON file."""
+    entries = [
+        {
+            "p": p,
+            "friend_size": friend_size,
+            "angles": {str(setting): angle for setting, angle in optimized.angles.items()},
+            "beta": optimized.beta,
+            "semi_brukner": optimized.semi_brukner,
+        }
+        for (p, friend_size), optimized in table.items()
+    ]
+    with open(path, "w") as file:
+        json.dump(entries, file, indent=2)
+
+
+def load_angle_table(path: str) -> dict[tuple[float, int], OptimizedAngles]:
+    """Reads an angle table written by `save_angle_table`."""
+    with open(path) as file:
+        entries = json.load(file)
+    return {
+        (entry["p"], entry["friend_size"]): OptimizedAngles(
+            angles={int(setting): angle for setting, angle in entry["angles"].items()},
+            beta=entry["beta"],
+            semi_brukner=entry["semi_brukner"],
+        )
+        for entry in entries
+    }
+
+
+def _peek_vector(initial_angle: np.ndarray, decoding: tuple[float, float], one_qubit: np.ndarray) -> np.ndarray:
+    """Bloch vector of the observable measured by PEEK, on the observer's qubit after preparation."""
+    _, odd = decoding
+    v = np.zeros((3,) + np.shape(initial_angle))
+    v[2] = odd
+    # ewfs_rotation: rz(-angle), h.
+    v = _hadamard(_scale(v, one_qubit))
+    return _rz(v, -initial_angle)
+
+
+def _reverse_vector(initial_angle: np.ndarray, angle: np.ndarray, factors: dict, ladder: str) -> np.ndarray:
+    """Bloch vector of the observable measured by REVERSE_1 or REVERSE_2, after preparation."""
+    one_qubit = factors["one_qubit"]
+    v = np.zeros((3,) + np.shape(angle))
+    v[2] = 1
+    # Measurement, ewfs_rotation(angle), undoing the first rotation (h, rz(angle)), and the ladder.
+    v = _hadamard(_scale(_scale(v, factors["measurement"]), one_qubit))
+    v = _rz(_rz(v, -angle), initial_angle)
+    v = _scale(_hadamard(_scale(v, one_qubit)), factors[ladder])
+    # First ewfs_rotation(initial_angle).
+    v = _hadamard(_scale(v, one_qubit))
+    return _rz(v, -initial_angle)
+
+
+def _rz(v: np.ndarray, angle: np.ndarray) -> np.ndarray:
+    """Heisenberg picture of rz(angle) on Bloch vectors."""
+    c, s = np.cos(angle), np.sin(angle)
+    return np.stack([c * v[0] + s * v[1], -s * v[0] + c * v[1], v[2]])
+
+
+def _hadamard(v: np.ndarray) -> np.ndarray:
+    return np.stack([v[2], -v[1], v[0]])
+
+
+def _scale(v: np.ndarray, factors: np.ndarray) -> np.ndarray:
+    """Multiply the x, y and z components of a batch of Bloch vectors by `factors`."""
+    return factors.reshape((3,) + (1,) * (v.ndim - 1)) * v
+
+
+@functools.lru_cache(maxsize=None)
+def _noise_factors(friend_size: int, debbie_size: int, noise: str | None, p: float, strategy: str) -> dict:
+    """Angle-independent factors of the effective two-qubit problem."""
+    if noise is not None and noise not in NOISE_MODELS:
+        raise ValueError(f"Noise model: {noise} is not defined.")
+    if strategy not in ("majority_vote", "random"):
+        raise ValueError(f"Strategy: {strategy} not defined.")
+
+    # prepare_bipartite_system on Alice (0) and Bob (1); the ideal state is the singlet.
+    prepare = [("x", 0), ("x", 1), ("h", 0), ("cx", 0, 1)]
+    correlations = -_flip_factors(_segment_errors(prepare, noise, p), [0, 1])
+
+    one_qubit = _flip_factors([_one_qubit_errors(noise, p)], [0])
+    measurement = _flip_factors([_measurement_errors(noise, p)], [0])
+
+    def ladder_gates(size: int) -> list[tuple]:
+        if strategy == "majority_vote":
+            return [("cx", 0, 1)] + [("cx", i, i + 1) for i in range(1, size)]
+        return [("cx", 0, i) for i in range(1, size + 1)]
+
+    def reverse_factors(size: int) -> np.ndarray:
+        forward = ladder_gates(size)
+        backward = forward[::-1] if strategy == "majority_vote" else forward
+        return _flip_factors(_segment_errors(forward + backward, noise, p), [0])
+
+    # PEEK on Charlie: distribution of the bit flips on the measured friend qubits.
+    masks = _segment_errors(ladder_gates(friend_size), noise, p)
+    masks = [[(prob, x >> 1) for prob, x, _ in errors] for errors in masks]
+    masks += [[(prob, 1 << q) for prob, _, _ in _measurement_errors(noise, p)] for q in range(friend_size)]
+    flips = _mask_distribution(masks, friend_size)
+
+    return {
+        "correlations": correlations,
+        "one_qubit": one_qubit,
+        "measurement": measurement,
+        "charlie_peek": _decoding(flips, friend_size, strategy),
+        "charlie_reverse": reverse_factors(friend_size),
+        "debbie_reverse": reverse_factors(debbie_size),
+    }
+
+
+def _decoding(flips: np.ndarray, friend_size: int, strategy: str) -> tuple[float, float]:
+    """Even and odd parts of the ±1 outcome of PEEK as a function of Alice's ±1 value.
+
+    `flips` is the probability of each bit-flip mask of the friend qubits.
+    """
+    masks = np.arange(len(flips))
+    if strategy == "random":
+        # A single friend qubit, chosen uniformly at random, is measured.
+        bits = (masks[:, None] >> np.arange(friend_size)) & 1
+        return 0.0, float(np.mean(flips @ (1 - 2 * bits)))
+
+    # Majority vote of `decode_results`: "0" if at least `friend_size // 2 + 1` zeros.
+    ones = np.zeros(len(flips), dtype=int)
+    for q in range(friend_size):
+        ones += (masks >> q) & 1
+    threshold = friend_size // 2 + 1
+    given_zero = flips @ np.where(friend_size - ones >= threshold, 1, -1)
+    given_one = flips @ np.where(ones >= threshold, 1, -1)
+    return float((given_zero + given_one) / 2), float((given_zero - given_one) / 2)
+
+
+def _one_qubit_errors(noise: str | None, p: float) -> PauliErrors:
+    if noise is None or p == 0:
+        return []
+    if noise == "bitflip":
+        return [(p, 1, 0)]
+    return [(p / 4, 1, 0), (p / 4, 1, 1), (p / 4, 0, 1)]
+
+
+def _two_qubit_errors(noise: str | None, p: float) -> PauliErrors:
+    if noise is None or p == 0:
+        return []
+    if noise == "bitflip":
+        return [(p * (1 - p), 1, 0), ((1 - p) * p, 2, 0), (p * p, 3, 0)]
+    return [(p / 16, x, z) for x in range(4) for z in range(4) if x or z]
+
+
+def _measurement_errors(noise: str | None, p: float) -> PauliErrors:
+    return _one_qubit_errors(noise, p) if noise == "bitflip" else []
+
+
+def _segment_errors(gates: list[tuple], noise: str | None, p: float) -> list[PauliErrors]:
+    """Errors after each gate of a Clifford segment, propagated to the end of the segment."""
+    locations = []
+    for i, gate in enumerate(gates):
+        qubits = gate[1:]
+        errors = _one_qubit_errors(noise, p) if len(qubits) == 1 else _two_qubit_errors(noise, p)
+        locations.append([
+            (prob, *_propagate(_place(x, qubits), _place(z, qubits), gates[i + 1:])) for prob, x, z in errors
+        ])
+    return locations
+
+
+def _place(bits: int, qubits: tuple[int, ...]) -> int:
+    return sum(((bits >> i) & 1) << q for i, q in enumerate(qubits))
+
+
+def _propagate(x: int, z: int, gates: list[tuple]) -> tuple[int, int]:
+    """Conjugate a Pauli error (up to sign) through Clifford gates."""
+    for gate in gates:
+        if gate[0] == "h":
+            q = gate[1]
+            swap = (((x >> q) ^ (z >> q)) & 1) << q
+            x, z = x ^ swap, z ^ swap
+        elif gate[0] == "cx":
+            control, target = gate[1:]
+            x ^= ((x >> control) & 1) << target
+            z ^= ((z >> target) & 1) << control
+    return x, z
+
+
+def _flip_factors(locations: list[PauliErrors], qubits: list[int]) -> np.ndarray:
+    """Factors by which independent Pauli errors scale σ_k on all `qubits`, for k = x, y, z."""
+    factors = np.ones(3)
+    for errors in locations:
+        flip = np.zeros(3)
+        for prob, x, z in errors:
+            # σ_x anticommutes with Z components, σ_z with X components and σ_y with either.
+            bx = sum((x >> q) & 1 for q in qubits) % 2
+            bz = sum((z >> q) & 1 for q in qubits) % 2
+            flip += prob * np.array([bz, bx ^ bz, bx])
+        factors *= 1 - 2 * flip
+    return factors
+
+
+def _mask_distribution(locations: list[list[tuple[float, int]]], num_bits: int) -> np.ndarray:
+    """Distribution of the XOR of independent random bit masks."""
+    indices = np.arange(2**num_bits)
+    distribution = np.zeros(2**num_bits)
+    distribution[0] = 1.0
+    for errors in locations:
+        by_mask = {}
+        for prob, mask in errors:
+            by_mask[mask] = by_mask.get(mask, 0.0) + prob
+        new = (1 - sum(by_mask.values())) * distribution
+        for mask, prob in by_mask.items():
+            new += prob * distribution[indices ^ mask]
+        distribution = new
+    return distribution
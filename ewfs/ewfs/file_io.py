@@ -2,7 +2,7 @@
 import os
 import pickle
 
-from .ewfs import compute_violations
+from .analysis import compute_violations
 
 
 def save_data(
@@ -1,9 +1,13 @@
-"""Custom noise models for simulator-based experiments."""
-from qiskit_aer.noise import (
-    depolarizing_error,
-    NoiseModel,
-    pauli_error,
-)
+"""Custom noise models for simulator-based experiments.
+
+Qiskit Aer is imported when a noise model is built, not when this module is imported.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from qiskit_aer.noise import NoiseModel
 
 
 def depolarizing_noise_model(error: float = 0.01) -> NoiseModel:
@@ -14,6 +18,8 @@ def depolarizing_noise_model(error: float = 0.01) -> NoiseModel:
     Returns:
         Depolarizing noise model.
     """
+    from qiskit_aer.noise import depolarizing_error, NoiseModel
+
     noise_model = NoiseModel()
     noise_model.add_all_qubit_quantum_error(depolarizing_error(error, 1), ["u1", "u2", "u3"])
     noise_model.add_all_qubit_quantum_error(depolarizing_error(error, 2), "cx")
@@ -28,6 +34,8 @@ def bitflip_model(p: float) -> NoiseModel:
     Returns:
         Bit-flip noise model.
     """
+    from qiskit_aer.noise import NoiseModel, pauli_error
+
     # Example error probabilities.
     p_meas = p
     p_gate1 = p
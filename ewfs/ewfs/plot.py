@@ -1,5 +1,5 @@
 import numpy as np
-from ewfs.ewfs import calculate_branch_factor
+from ewfs.analysis import calculate_branch_factor
 
 
 def plot_results(
@@ -0,0 +1,63 @@
+"""Import-time regression tests for the NumPy-only analysis path."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing NumPy alone takes about 0.06 s and Qiskit about 0.4 s. Wall-clock timings depend on the
+# machine, so the budget is only checked when EWFS_CHECK_IMPORT_TIME=1 is set.
+IMPORT_BUDGET_SECONDS = 0.3
+CHECK_IMPORT_TIME = os.environ.get("EWFS_CHECK_IMPORT_TIME") == "1"
+
+ANALYSIS_MODULES = ["ewfs.analysis", "ewfs.file_io", "ewfs.plot", "ewfs.angles"]
+LAZY_MODULES = ["ewfs.ewfs", "ewfs.noise_models"]
+
+
+def _import_in_fresh_interpreter(modules: list[str]) -> dict:
+    """Import `modules` in a new process and report the time taken and the Qiskit modules loaded."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {modules!r}:\n"
+        "    __import__(name)\n"
+        "seconds = time.perf_counter() - start\n"
+        "qiskit = sorted(m for m in sys.modules if m.split('.')[0] in ('qiskit', 'qiskit_aer'))\n"
+        "print(json.dumps({'seconds': seconds, 'qiskit': qiskit}))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("modules", [ANALYSIS_MODULES, ANALYSIS_MODULES + LAZY_MODULES])
+def test_analysis_path_does_not_import_qiskit(modules):
+    assert _import_in_fresh_interpreter(modules)["qiskit"] == []
+
+
+@pytest.mark.skipif(not CHECK_IMPORT_TIME, reason="set EWFS_CHECK_IMPORT_TIME=1 to check the import time")
+def test_analysis_path_import_time():
+    # Best of a few runs, to keep a busy machine from failing the test.
+    seconds = min(_import_in_fresh_interpreter(ANALYSIS_MODULES)["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"Importing the analysis path took {seconds:.3f} s."
+
+
+def test_backward_compatible_names():
+    from ewfs import analysis, ewfs
+
+    for name in ["PEEK", "REVERSE_1", "REVERSE_2", "ANGLES", "BETA", "Setting", "decode_results",
+                 "compute_violations", "calculate_branch_factor"]:
+        assert getattr(ewfs, name) is getattr(analysis, name)
+
+
+def test_circuit_still_builds():
+    pytest.importorskip("qiskit")
+    from ewfs.ewfs import ANGLES, BETA, PEEK, REVERSE_2, ewfs
+
+    qc = ewfs(PEEK, REVERSE_2, "majority_vote", ANGLES, BETA, charlie_size=3)
+    assert qc.num_qubits == 6
+    assert qc.count_ops()["measure"] == 4
@@ -0,0 +1,227 @@
+"""Deduplicated batch execution of layerwise-folded circuits for LRE.
+
+The folded circuits of an LRE estimate are canonicalized so that every distinct circuit is
+simulated only once. Noisy execution submits all unique circuits to Aer as a single
+multi-experiment job at the largest shot count and subsamples the shots of each circuit, while noiseless execution walks the circuits in lexicographic order and
+reuses the statevector of every shared prefix.
+"""
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+import qiskit
+from qiskit.providers import Backend
+from qiskit.quantum_info import Statevector
+from qiskit_aer.noise import NoiseModel
+
+from richardson import get_eta_coeffs
+
+
+# Instructions that do not act on the state of the qubits.
+NON_UNITARY = {"measure", "barrier"}
+
+
+def instruction_keys(circuit: qiskit.QuantumCircuit) -> tuple[tuple, ...]:
+    """Canonical, hashable representation of the gates of a circuit (measurements and barriers excluded)."""
+    keys = []
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in NON_UNITARY:
+            continue
+        keys.append((
+            operation.name,
+            tuple(_parameter_key(p) for p in operation.params),
+            tuple(circuit.find_bit(q).index for q in instruction.qubits),
+        ))
+    return tuple(keys)
+
+
+def deduplicate_circuits(
+    circuits: Sequence[qiskit.QuantumCircuit],
+) -> tuple[list[qiskit.QuantumCircuit], np.ndarray]:
+    """Keep the first occurrence of each distinct circuit.
+
+    Returns:
+        The unique circuits and, for every input circuit, the index of its unique representative
+        so that `[unique[i] for i in indices]` reproduces the input order.
+    """
+    unique, indices, seen = [], [], {}
+    for circuit in circuits:
+        key = (circuit.num_qubits, instruction_keys(circuit))
+        if key not in seen:
+            seen[key] = len(unique)
+            unique.append(circuit)
+        indices.append(seen[key])
+    return unique, np.array(indices, dtype=int)
+
+
+def execute_batch(
+    circuits: Sequence[qiskit.QuantumCircuit],
+    backend: Backend,
+    shots: Sequence[int],
+    noise_model: Optional[NoiseModel] = None,
+) -> np.ndarray:
+    """Probability of the all-zero bitstring for each circuit, running each distinct circuit once.
+
+    Shots of duplicate circuits are pooled into a single experiment and every duplicate gets the
+    pooled estimate. Unique circuits are submitted as one multi-experiment job at the largest shot
+    count with per-shot memory, and the estimate of a circuit uses only its first requested shots.
+
+    Args:
+        circuits: Folded circuits in sample-matrix order (without measurements).
+        backend: Aer backend used to run the circuits.
+        shots: Number of shots requested for each circuit.
+        noise_model: Optional noise model passed to the simulator.
+    Returns:
+        Expectation values in the same order as `circuits`.
+    """
+    unique, indices = deduplicate_circuits(circuits)
+    unique_shots = np.bincount(indices, weights=shots, minlength=len(unique)).astype(int)
+
+    run = [i for i in range(len(unique)) if unique_shots[i] > 0]
+
+    unique_values = np.zeros(len(unique))
+    if not run:
+        return unique_values[indices]
+
+    experiments = []
+    for i in run:
+        circuit_with_measurement = unique[i].copy()
+        circuit_with_measurement.measure_all()
+        experiments.append(circuit_with_measurement)
+
+    # Optimization level 0 is important to preserve folded gates.
+    if noise_model is not None:
+        experiments = qiskit.transpile(experiments, basis_gates=noise_model.basis_gates, optimization_level=0)
+    else:
+        experiments = qiskit.transpile(experiments, backend=backend, optimization_level=0)
+    run_options = {"noise_model": noise_model} if noise_model is not None else {}
+    max_shots = int(unique_shots[run].max())
+    result = backend.run(experiments, shots=max_shots, memory=True, **run_options).result()
+
+    # Shots are independent, so the first `n` of them are an unbiased sample of `n` shots.
+    for i, experiment in zip(run, experiments):
+        memory = result.get_memory(experiment)[:unique_shots[i]]
+        unique_values[i] = memory.count("0" * unique[i].num_qubits) / unique_shots[i]
+
+    return unique_values[indices]
+
+
+def execute_noiseless_batch(circuits: Sequence[qiskit.QuantumCircuit]) -> np.ndarray:
+    """Exact probability of the all-zero bitstring for each circuit, reusing shared prefix states.
+
+    Circuits are visited in lexicographic order of their gates, so that circuits sharing a prefix
+    are adjacent. The statevector at the branching point with the next circuit is kept on a stack
+    and only the differing suffix of each circuit is simulated.
+    """
+    unique, indices = deduplicate_circuits(circuits)
+    keys = [instruction_keys(circuit) for circuit in unique]
+    gates = [
+        [(instr.operation, [circuit.find_bit(q).index for q in instr.qubits])
+         for instr in circuit.data if instr.operation.name not in NON_UNITARY]
+        for circuit in unique
+    ]
+    order = sorted(range(len(unique)), key=lambda i: (unique[i].num_qubits, keys[i]))
+
+    # Length of the prefix shared by each circuit with its predecessor in `order`.
+    shared = [0] * len(order)
+    for position in range(1, len(order)):
+        a, b = order[position - 1], order[position]
+        if unique[a].num_qubits == unique[b].num_qubits:
+            shared[position] = _common_prefix_length(keys[a], keys[b])
+
+    unique_values = np.zeros(len(unique))
+    stack = []
+    for position, i in enumerate(order):
+        num_qubits = unique[i].num_qubits
+        if position == 0 or unique[order[position - 1]].num_qubits != num_qubits:
+            stack = [(0, Statevector.from_int(0, 2**num_qubits))]
+        while stack[-1][0] > shared[position]:
+            stack.pop()
+        start, state = stack[-1]
+
+        # Depths along this circuit at which later circuits branch off and will resume from.
+        branches, depth = set(), len(gates[i])
+        for later in range(position + 1, len(order)):
+            depth = min(depth, shared[later])
+            if depth <= start:
+                break
+            branches.add(depth)
+
+        for k, (operation, qargs) in enumerate(gates[i][start:], start=start):
+            if k in branches:
+                stack.append((k, state))
+            state = state.evolve(operation, qargs=qargs)
+        if len(gates[i]) in branches:
+            stack.append((len(gates[i]), state))
+
+        unique_values[i] = float(np.abs(state.data[0]) ** 2)
+
+    return unique_values[indices]
+
+
+def execute_with_lre(
+    circuit: qiskit.QuantumCircuit,
+    scale_noise: Callable[[qiskit.QuantumCircuit, tuple[int, ...]], qiskit.QuantumCircuit],
+    lre_scale_factors: list[tuple[int, ...]],
+    degree: int,
+    shots: int,
+    optimize_shots: bool,
+    backend: Optional[Backend] = None,
+    noise_model: Optional[NoiseModel] = None,
+) -> float:
+    """LRE estimate with all folded circuits executed as one deduplicated batch.
+
+    Args:
+        circuit: The circuit to mitigate.
+        scale_noise: Layerwise noise scaling function, e.g. `chunkwise_noise_scaling` from the notebook.
+        lre_scale_factors: Per-layer scale factors for each sample point, e.g. from `generate_scale_factors`.
+        degree: Degree of the multivariate extrapolation polynomial.
+        shots: Total shot budget split across the sample points.
+        optimize_shots: Allocate shots proportionally to the magnitude of the eta coefficients.
+        backend: Aer backend. If `None`, noiseless values are computed exactly without shot noise.
+        noise_model: Optional noise model passed to the simulator. Requires a backend.
+    Returns:
+        The zero-noise extrapolated expectation value.
+    Raises:
+        ValueError: If a noise model is given without a backend.
+    """
+    if backend is None and noise_model is not None:
+        raise ValueError("A noise model requires a backend; without one, values are computed noiselessly.")
+
+    eta_coeffs = get_eta_coeffs(lre_scale_factors, degree)
+    folded_circuits = [scale_noise(circuit, scale_factors) for scale_factors in lre_scale_factors]
+
+    if backend is None:
+        return float(np.dot(execute_noiseless_batch(folded_circuits), eta_coeffs))
+
+    if optimize_shots:
+        shots_factors = np.abs(eta_coeffs)
+        rescaled_shots = np.floor(shots * shots_factors / np.sum(shots_factors)).astype(int)
+    else:
+        rescaled_shots = np.full(len(eta_coeffs), shots // len(eta_coeffs))
+
+    noisy_values = execute_batch(folded_circuits, backend, rescaled_shots, noise_model)
+    return float(np.dot(noisy_values, eta_coeffs))
+
+
+def _parameter_key(param: Any) -> tuple:
+    """Hashable and totally ordered key of a gate parameter.
+
+    Numbers, arrays (e.g. the matrix of a unitary gate) and anything else are tagged so that
+    parameters of different types can be sorted together.
+    """
+    if isinstance(param, np.ndarray):
+        return (1, param.shape, str(param.dtype), param.tobytes())
+    if isinstance(param, (int, float, complex, np.number)):
+        value = complex(param)
+        return (0, value.real, value.imag)
+    return (2, str(param))
+
+
+def _common_prefix_length(a: tuple, b: tuple) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
@@ -0,0 +1,131 @@
+"""Sample matrix and extrapolation coefficients for layerwise Richardson extrapolation (LRE).
+
+Monomials are represented by integer exponent matrices rather than strings, so that the
+sample matrix can be built with a vectorized power-product instead of one `eval` per entry.
+"""
+import functools
+import itertools
+
+import numpy as np
+
+
+def get_exponents(n: int, d: int) -> np.ndarray:
+    """Exponent matrix of all monomials in `n` variables up to degree `d` in graded lexicographical order.
+
+    Row `j` holds the exponent of each variable `λ_1, ..., λ_n` in the `j`-th monomial. Variables
+    are ordered by index, which matches the string monomials of `get_monomials` in the notebook for
+    `n < 10`, e.g. for `n = d = 2` the rows are `['1', 'λ_2', 'λ_1', 'λ_2**2', 'λ_1*λ_2', 'λ_1**2']`.
+
+    Args:
+        n: Number of variables (layers or chunks of the circuit).
+        d: Maximum total degree of the monomials.
+    Returns:
+        Integer array of shape `(num_monomials, n)`.
+    """
+    return _exponents(n, d).copy()
+
+
+def get_monomials(n: int, d: int) -> list[str]:
+    """Human-readable monomials of degree `d` in graded lexicographical order."""
+    monomials = []
+    for row in _exponents(n, d):
+        parts = [f"λ_{k + 1}" if e == 1 else f"λ_{k + 1}**{e}" for k, e in enumerate(row) if e > 0]
+        monomials.append("*".join(parts) if parts else "1")
+    return monomials
+
+
+def sample_matrix(sample_points: list[tuple[float, ...]], degree: int) -> np.ndarray:
+    """Construct a matrix from monomials evaluated at sample points.
+
+    Cached per `(number of variables, degree, sample points)`. The returned array is read-only;
+    copy it before modifying in place.
+
+    Args:
+        sample_points: One tuple of per-layer scale factors for each row of the matrix.
+        degree: Maximum total degree of the monomials.
+    Returns:
+        Array of shape `(len(sample_points), num_monomials)`.
+    """
+    points = tuple(tuple(point) for point in sample_points)
+    return _sample_matrix(len(points[0]), degree, points)
+
+
+def get_eta_coeffs_from_sample_matrix(mat: np.ndarray) -> np.ndarray:
+    """Given a sample matrix compute the eta coefficients.
+
+    The coefficients solve `mat.T @ eta = e_0`, where `e_0` selects the constant monomial (first
+    column), so that `eta @ f(sample_points) = f(0)` for every polynomial `f` in the basis. The
+    columns are equilibrated before an LU solve instead of forming one determinant per row.
+    """
+    n_rows, n_cols = mat.shape
+    if n_rows != n_cols:
+        raise ValueError("The matrix must be square.")
+
+    col_scale = np.max(np.abs(mat), axis=0)
+    if np.any(col_scale == 0):
+        raise ValueError("The matrix is singular.")
+
+    rhs = np.zeros(n_cols)
+    rhs[0] = 1.0 / col_scale[0]
+    try:
+        return np.linalg.solve((mat / col_scale).T, rhs)
+    except np.linalg.LinAlgError as err:
+        raise ValueError("The matrix is singular.") from err
+
+
+def get_eta_coeffs(lre_scale_factors: list[tuple[float, ...]], degree: int) -> np.ndarray:
+    """Obtain eta coefficients from list of scale factors and degree."""
+    points = tuple(tuple(point) for point in lre_scale_factors)
+    return _eta_coeffs(len(points[0]), degree, points).copy()
+
+
+@functools.lru_cache(maxsize=None)
+def _exponents(n: int, d: int) -> np.ndarray:
+    exponents = np.zeros((_num_monomials(n, d), n), dtype=int)
+    row = 0
+    for degree in range(d + 1):
+        # Reverse lexicographic order of variable indices within each degree.
+        combos = list(itertools.combinations_with_replacement(range(n), degree))
+        for combo in reversed(combos):
+            exponents[row] = np.bincount(np.array(combo, dtype=int), minlength=n)
+            row += 1
+    exponents.flags.writeable = False
+    return exponents
+
+
+@functools.lru_cache(maxsize=None)
+def _variable_indices(n: int, d: int) -> np.ndarray:
+    """Variables of each monomial with repetition, padded to length `d` with the index `n`."""
+    exponents = _exponents(n, d)
+    indices = np.full((len(exponents), max(d, 1)), n, dtype=int)
+    for row, exps in enumerate(exponents):
+        variables = np.repeat(np.arange(n), exps)
+        indices[row, :len(variables)] = variables
+    indices.flags.writeable = False
+    return indices
+
+
+def _num_monomials(n: int, d: int) -> int:
+    # Number of monomials of degree at most d in n variables: binom(n + d, d).
+    count = 1
+    for k in range(1, d + 1):
+        count = count * (n + k) // k
+    return count
+
+
+@functools.lru_cache(maxsize=128)
+def _sample_matrix(n: int, degree: int, points: tuple[tuple[float, ...], ...]) -> np.ndarray:
+    # Append a column of ones so the padding index contributes a factor of 1. Each monomial has
+    # at most `degree` variable factors, so this costs O(points * monomials * degree) memory
+    # instead of O(points * monomials * n) for a dense power-product over all variables.
+    padded = np.hstack([np.asarray(points, dtype=float), np.ones((len(points), 1))])
+    matrix = np.prod(padded[:, _variable_indices(n, degree)], axis=2)
+    matrix.flags.writeable = False
+    return matrix
+
+
+@functools.lru_cache(maxsize=128)
+def _eta_coeffs(n: int, degree: int, points: tuple[tuple[float, ...], ...]) -> np.ndarray:
+    coeffs = get_eta_coeffs_from_sample_matrix(_sample_matrix(n, degree, points))
+    coeffs.flags.writeable = False
+    return coeffs
@@ -0,0 +1,140 @@
+"""Cached density-matrix executors for the NEPEC notebooks.
+
+PEC sampling and noise-level scans execute the same circuits at the same noise levels many
+times. The executors below simulate each distinct (circuit, noise level) pair only once with a
+shared `DensityMatrixSimulator`, keep ⟨0...0|ρ|0...0⟩ in a memory-bounded LRU cache, and draw shot
+noise around the cached exact value.
+
+The notebooks live in subdirectories, so add this folder to the import path first:
+
+    import sys; sys.path.append("..")
+    from executors import ideal_executor, noisy_executor, noisy_executor_shots
+"""
+import hashlib
+import sys
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import numpy as np
+from cirq import Circuit, DensityMatrixSimulator, depolarize
+
+
+SIMULATOR = DensityMatrixSimulator()
+
+
+class ExpectationCache:
+    """LRU cache of exact expectation values keyed by (circuit fingerprint, noise level).
+
+    Args:
+        max_bytes: Approximate memory bound of the stored keys and values. The least recently used
+            entries are evicted once it is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: tuple[str, float]) -> Optional[float]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple[str, float], value: float) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = value
+        self.num_bytes += _entry_size(key, value)
+        while self.num_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_value = self._entries.popitem(last=False)
+            self.num_bytes -= _entry_size(old_key, old_value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.num_bytes = self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+CACHE = ExpectationCache()
+
+
+def circuit_fingerprint(circ: Circuit) -> str:
+    """Hash of the operations (and moment structure) of a circuit."""
+    return hashlib.sha256(repr(circ).encode()).hexdigest()
+
+
+def exact_expectation(circ: Circuit, noise_level: float = 0.0) -> float:
+    """⟨0...0|ρ|0...0⟩ of the circuit with local depolarizing noise, simulated at most once."""
+    key = (circuit_fingerprint(circ), float(noise_level))
+    expectation = CACHE.get(key)
+    if expectation is None:
+        noisy_circuit = circ.with_noise(depolarize(noise_level)) if noise_level else circ
+        rho = SIMULATOR.simulate(noisy_circuit).final_density_matrix
+        expectation = float(np.real(rho[0, 0]))
+        CACHE.put(key, expectation)
+    return expectation
+
+
+def ideal_executor(circ: Circuit) -> float:
+    """Simulates a circuit without noise and returns the expectation value
+    of the projector |00...><00...|.
+    """
+    return exact_expectation(circ)
+
+
+def noisy_executor(
+    circ: Circuit,
+    noise_level: float,
+    shot_noise: float = 0,
+    random_state: Optional[np.random.RandomState] = None,
+) -> float:
+    """Simulates a circuit with depolarizing noise and returns the expectation value
+    of the projector |00...><00...|, plus Gaussian shot noise.
+
+    Like the notebook version, a normal sample is drawn on every call, even with `shot_noise=0`,
+    so passing the notebook's seeded `rnd_state` consumes it the same way and reproduces its
+    results. Without `random_state`, the global `np.random` is used.
+    """
+    expectation = exact_expectation(circ, noise_level)
+    random_state = np.random if random_state is None else random_state
+    return expectation + random_state.normal(scale=shot_noise)
+
+
+def noisy_executor_shots(circ: Circuit, base_noise: float, shots: int = 0) -> float:
+    """Simulates a circuit with depolarizing noise and returns the expectation value
+    of the projector on the ground state |00...><00...|.
+
+    If `shots` is nonzero, shot noise is drawn with a single binomial sample. It has the same
+    distribution as the average of `shots` Bernoulli samples of the notebook version, but draws
+    different numbers from the global `np.random` stream, so seeded results differ.
+    """
+    expectation = exact_expectation(circ, base_noise)
+    if shots == 0:
+        return expectation
+    return np.random.binomial(shots, np.clip(expectation, 0, 1)) / shots
+
+
+def batched_noisy_executor_shots(circuits: Sequence[Circuit], base_noise: float, shots: int = 0) -> list[float]:
+    """Batched version of `noisy_executor_shots`.
+
+    Each distinct circuit is simulated at most once and shot noise for the whole batch is drawn
+    with one vectorized binomial call. The `list[float]` return annotation lets Mitiq pass all PEC
+    samples in a single call.
+    """
+    expectations = np.array([exact_expectation(circ, base_noise) for circ in circuits])
+    if shots == 0:
+        return expectations.tolist()
+    return (np.random.binomial(shots, np.clip(expectations, 0, 1)) / shots).tolist()
+
+
+def _entry_size(key: tuple[str, float], value: float) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + sys.getsizeof(value)
@@ -0,0 +1,245 @@
+"""Persistent store of optimal quasi-probability representations for the NEPEC notebooks.
+
+Finding an optimal representation is a numerical optimization that dominates the setup time of
+`exact_nepec_representations.ipynb`, and its result only depends on the superoperators involved
+and the tolerance. Representations are therefore keyed by a hash of the ideal operation's
+superoperator, the noisy basis superoperators, the noise scale factor and the tolerance, solved in
+parallel when missing, and saved on disk so that later sessions and sweeps over the noise level
+reuse earlier solves.
+
+The notebooks live in subdirectories, so add this folder to the import path first:
+
+    import sys; sys.path.append("..")
+    from representations import STORE, represent_operation_with_nepec
+
+    damp_rep_scaled = STORE.find_optimal_representation(ideal_operation, damp_basis_elements_scaled)
+"""
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+from cirq import Circuit, kraus
+from mitiq.pec.channels import kraus_to_super
+from mitiq.pec.representations.optimal import minimize_one_norm
+from mitiq.pec.types import NoisyOperation, OperationRepresentation
+from mitiq.zne.scaling import fold_all
+
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".representation_store")
+
+
+def get_richardson_coefficients(scale_factors: Sequence[float]) -> List[float]:
+    """Returns the array of Richardson extrapolation coefficients associated
+    to the input array of scale factors.
+
+    The coefficient of λ_i is the Lagrange basis polynomial Π_{j≠i} λ_j / (λ_j - λ_i) evaluated at 0.
+    """
+    return list(_richardson_coefficients(tuple(float(s) for s in scale_factors)))
+
+
+def represent_operation_with_nepec(
+    ideal_operation: Circuit,
+    scale_factors: Sequence[float],
+    scale_circuit=fold_all,
+) -> OperationRepresentation:
+    """Returns the OperationRepresentation contructed by noise scaling and extrapolation."""
+    coeffs = get_richardson_coefficients(scale_factors)
+    noisy_operations = [NoisyOperation(scale_circuit(ideal_operation, s)) for s in scale_factors]
+    return OperationRepresentation(ideal_operation, noisy_operations, coeffs)
+
+
+def ideal_superoperator(ideal_operation: Circuit) -> np.ndarray:
+    """Superoperator of a circuit, composed from the superoperators of its operations."""
+    super_ops = [kraus_to_super(list(kraus(op))) for op in ideal_operation.all_operations()]
+    return functools.reduce(lambda a, b: a @ b, super_ops)
+
+
+def representation_key(
+    ideal_matrix: np.ndarray,
+    basis_matrices: Sequence[np.ndarray],
+    scale_factor: float = 1.0,
+    tol: float = 1.0e-8,
+) -> str:
+    """Hash of the ideal superoperator, the noisy basis superoperators, the scale factor and the tolerance."""
+    digest = hashlib.sha256()
+    for matrix in [ideal_matrix, *basis_matrices]:
+        matrix = np.ascontiguousarray(matrix, dtype=complex)
+        digest.update(repr(matrix.shape).encode())
+        digest.update(matrix.tobytes())
+    digest.update(repr(float(scale_factor)).encode())
+    digest.update(repr(float(tol)).encode())
+    return digest.hexdigest()
+
+
+class RepresentationStore:
+    """Optimal representations, keyed by `representation_key` and persisted in a directory.
+
+    Only the optimal coefficients are stored, one `.npy` file per key. A failed optimization is
+    stored as well, so that it is not attempted again at the same tolerance; a looser `tol` is a
+    different key and is solved anew.
+
+    Args:
+        path: Directory of the store. If `None`, representations are only kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = STORE_DIR):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._coeffs = {}
+
+    def find_optimal_representation(
+        self,
+        ideal_operation: Circuit,
+        noisy_operations: Sequence[NoisyOperation],
+        tol: float = 1.0e-8,
+        initial_guess: Optional[np.ndarray] = None,
+        is_qubit_dependent: bool = True,
+        scale_factor: float = 1.0,
+    ) -> OperationRepresentation:
+        """Stored version of `mitiq.pec.representations.optimal.find_optimal_representation`.
+
+        Takes the same arguments, plus the noise scale factor of the basis. `initial_guess` only
+        seeds the optimization when the representation is not stored yet.
+
+        Raises:
+            RuntimeError: If the search for an optimal representation failed.
+        """
+        representation, = self.find_optimal_representations(
+            [ideal_operation],
+            [noisy_operations],
+            [scale_factor],
+            tol=tol,
+            initial_guesses=[initial_guess],
+            is_qubit_dependent=is_qubit_dependent,
+            max_workers=1,
+        )
+        if representation is None:
+            raise RuntimeError("The search for an optimal representation failed.")
+        return representation
+
+    def find_optimal_representations(
+        self,
+        ideal_operations: Sequence[Circuit],
+        noisy_bases: Sequence[Sequence[NoisyOperation]],
+        scale_factors: Sequence[float],
+        tol: float = 1.0e-8,
+        initial_guesses: Optional[Sequence[Optional[np.ndarray]]] = None,
+        is_qubit_dependent: bool = True,
+        max_workers: Optional[int] = None,
+    ) -> List[Optional[OperationRepresentation]]:
+        """Optimal representations of many operations, solving the missing ones in parallel.
+
+        Args:
+            ideal_operations: Ideal operations to represent.
+            noisy_bases: Noisy operations with known channel matrices, one basis per operation.
+            scale_factors: Noise scale factor of each basis, e.g. 1 for PEC or the largest scale
+                factor of a NEPEC basis.
+            tol: The error tolerance for each matrix element of the represented operation.
+            initial_guesses: Optional initial guess of the coefficients of each operation, used
+                for the ones that are solved.
+            is_qubit_dependent: Whether the representations only hold on the qubits of the ideal
+                operations (see `OperationRepresentation`).
+            max_workers: Number of worker processes. With 1, missing representations are solved in
+                this process.
+        Returns:
+            One representation per operation, or `None` where the optimization failed.
+        """
+        if initial_guesses is None:
+            initial_guesses = [None] * len(ideal_operations)
+
+        problems = []
+        for ideal_operation, noisy_operations, scale_factor, initial_guess in zip(
+            ideal_operations, noisy_bases, scale_factors, initial_guesses
+        ):
+            ideal_matrix = ideal_superoperator(ideal_operation)
+            basis_matrices = [op.channel_matrix for op in noisy_operations]
+            key = representation_key(ideal_matrix, basis_matrices, scale_factor, tol)
+            problems.append((key, ideal_matrix, basis_matrices, initial_guess))
+
+        missing = {}
+        for key, ideal_matrix, basis_matrices, initial_guess in problems:
+            if key in missing or self._load(key) is not None:
+                continue
+            missing[key] = (ideal_matrix, basis_matrices, tol, initial_guess)
+        self.hits += len(problems) - len(missing)
+        self.misses += len(missing)
+
+        if max_workers == 1 or len(missing) <= 1:
+            solutions = [_solve(problem) for problem in missing.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                solutions = list(pool.map(_solve, missing.values()))
+        for key, coeffs in zip(missing, solutions):
+            self._save(key, coeffs)
+
+        representations = []
+        for (key, *_), ideal_operation, noisy_operations in zip(problems, ideal_operations, noisy_bases):
+            coeffs = self._coeffs[key]
+            if coeffs.size == 0:
+                representations.append(None)
+            else:
+                representations.append(
+                    OperationRepresentation(ideal_operation, list(noisy_operations), coeffs.tolist(), is_qubit_dependent)
+                )
+        return representations
+
+    def clear(self) -> None:
+        """Remove all stored representations, in memory and on disk."""
+        self._coeffs.clear()
+        self.hits = self.misses = 0
+        if self.path is not None and os.path.isdir(self.path):
+            for filename in os.listdir(self.path):
+                if filename.endswith(".npy"):
+                    os.remove(os.path.join(self.path, filename))
+
+    def __len__(self) -> int:
+        return len(self._coeffs)
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        if key not in self._coeffs and self.path is not None:
+            filepath = os.path.join(self.path, f"{key}.npy")
+            if os.path.isfile(filepath):
+                self._coeffs[key] = np.load(filepath)
+        return self._coeffs.get(key)
+
+    def _save(self, key: str, coeffs: np.ndarray) -> None:
+        self._coeffs[key] = coeffs
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        filepath = os.path.join(self.path, f"{key}.npy")
+        # Write to a temporary file first so that concurrent sessions never read a partial file.
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            np.save(handle, coeffs)
+        os.replace(tmp_path, filepath)
+
+
+STORE = RepresentationStore()
+
+
+@functools.lru_cache(maxsize=None)
+def _richardson_coefficients(scale_factors: tuple[float, ...]) -> np.ndarray:
+    scale_factors = np.array(scale_factors)
+    # ratios[i, j] = λ_j / (λ_j - λ_i), with ones on the diagonal.
+    differences = scale_factors[np.newaxis, :] - scale_factors[:, np.newaxis]
+    np.fill_diagonal(differences, 1.0)
+    ratios = scale_factors[np.newaxis, :] / differences
+    np.fill_diagonal(ratios, 1.0)
+    coeffs = np.prod(ratios, axis=1)
+    coeffs.setflags(write=False)
+    return coeffs
+
+
+def _solve(problem: tuple[np.ndarray, list[np.ndarray], float, Optional[np.ndarray]]) -> np.ndarray:
+    ideal_matrix, basis_matrices, tol, initial_guess = problem
+    try:
+        return np.asarray(
+            minimize_one_norm(ideal_matrix, basis_matrices, tol=tol, initial_guess=initial_guess), dtype=float
+        )
+    except RuntimeError:
+        return np.empty(0)
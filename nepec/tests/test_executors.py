@@ -0,0 +1,42 @@
+"""Tests of the cached executors against the executors of the notebooks."""
+from functools import partial
+
+import numpy as np
+import pytest
+from cirq import DensityMatrixSimulator, depolarize
+from mitiq import pec
+from mitiq.benchmarks import generate_rb_circuits
+from mitiq.pec.representations.depolarizing import represent_operations_in_circuit_with_local_depolarizing_noise
+
+from executors import CACHE, noisy_executor
+
+
+def reference_noisy_executor(circ, noise_level, shot_noise, random_state):
+    """`noisy_executor` of `noise_agnostic_pec.ipynb`, with its global `rnd_state` as an argument."""
+    noisy_circuit = circ.with_noise(depolarize(noise_level))
+    rho = DensityMatrixSimulator().simulate(noisy_circuit).final_density_matrix
+    return np.real(rho[0, 0]) + random_state.normal(scale=shot_noise)
+
+
+@pytest.mark.parametrize("shot_noise", [0, 0.01])
+def test_noisy_executor_reproduces_seeded_runs(shot_noise):
+    CACHE.clear()
+    circuit, = generate_rb_circuits(n_qubits=1, num_cliffords=2, trials=1, seed=1)
+    noise_level = 0.05
+    representations = represent_operations_in_circuit_with_local_depolarizing_noise(circuit, noise_level)
+
+    def seeded_run(executor):
+        # The unmitigated, PEC and NEPEC values of one noise level share one seeded stream, as in
+        # the notebook, so each execution must consume it the same way.
+        rnd_state = np.random.RandomState(0)
+        executor = partial(executor, noise_level=noise_level, shot_noise=shot_noise, random_state=rnd_state)
+        unmitigated = executor(circuit)
+        mitigated = [
+            pec.execute_with_pec(
+                circuit, executor, representations=representations, num_samples=50, random_state=rnd_state
+            )
+            for _ in range(2)
+        ]
+        return [unmitigated, *mitigated]
+
+    assert seeded_run(noisy_executor) == pytest.approx(seeded_run(reference_noisy_executor), abs=1e-6)
@@ -0,0 +1,270 @@
+"""Indexed catalog of the runs saved by `pec_and_zne.ipynb` in `data/`.
+
+Each run directory (e.g. `data/simulator/zne/rb/depolarizing/depolarizing_zne_rb_5_1_20_10000_4/`)
+holds one `(depth, trial)` text file per saved quantity, with the time of the run appended to the
+file name. The catalog parses every run once into a single columnar dataset with one row per
+(run, depth, trial), stores it in `data/catalog.npz`, and only parses new or changed directories
+when it is rebuilt.
+
+Usage:
+
+    from catalog import build_catalog
+
+    catalog = build_catalog()
+    depths, zne, true = catalog.query(
+        "depth", "mitigated_value", "true_value", method="zne", benchmark="rb", device="ibmq"
+    )
+"""
+import hashlib
+import os
+import re
+import warnings
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog.npz")
+
+# Quantities saved by the notebook with one value per (depth, trial), and their catalog columns.
+VALUE_FILES = {
+    "true_values": "true_value",
+    "noisy_values": "noisy_value",
+    "zne_values": "mitigated_value",
+    "pec_values": "mitigated_value",
+    "cnot_counts": "cnot_count",
+    "oneq_counts": "oneq_count",
+}
+# Quantity saved with one value per (depth, trial, scale factor), only for ZNE.
+SCALED_VALUES_FILE = "noise_scaled_expectation_values"
+
+# Directory names written by the notebook, e.g. `ibmq_zne_rb_nqubits_3_mindepth_1_maxdepth_20_...`,
+# and the shorter names of the runs in `data/`, e.g. `ibmq_zne_rb_3_1_20_10000_4`.
+DIR_PATTERNS = [
+    re.compile(
+        r"(?P<device>\w+)_(?P<method>zne|pec)_(?P<benchmark>rb|mirror)_nqubits_(?P<num_qubits>\d+)"
+        r"_mindepth_(?P<min_depth>\d+)_maxdepth_(?P<max_depth>\d+)_shots_(?P<shots>\d+)_trials_(?P<trials>\d+)$"
+    ),
+    re.compile(
+        r"(?P<device>\w+)_(?P<method>zne|pec)_(?P<benchmark>rb|mirror)_(?P<num_qubits>\d+)"
+        r"_(?P<min_depth>\d+)_(?P<max_depth>\d+)_(?P<shots>\d+)_(?P<trials>\d+)$"
+    ),
+]
+# `time.asctime()` with whitespace replaced by underscores. A few files use `_` instead of `:`.
+FILE_PATTERN = re.compile(
+    r"(?P<quantity>[a-z_]+?)_(?P<weekday>[A-Z][a-z]{2})_(?P<month>[A-Z][a-z]{2})_(?P<day>\d{1,2})"
+    r"_(?P<hour>\d{2})[:_](?P<minute>\d{2})[:_](?P<second>\d{2})[:_](?P<year>\d{4})\.txt$"
+)
+
+RUN_COLUMNS = ["run", "path", "platform", "method", "benchmark", "device",
+               "num_qubits", "min_depth", "max_depth", "shots", "trials", "timestamp"]
+ROW_COLUMNS = ["depth", "trial", "true_value", "noisy_value", "mitigated_value", "cnot_count", "oneq_count"]
+
+
+class Catalog:
+    """Columnar dataset with one row per (run, depth, trial).
+
+    Columns are NumPy arrays of equal length:
+        run, path, platform, method, benchmark, device: Strings identifying the run. `platform` is
+            "hardware" or "simulator", `device` is the device or noise model (e.g. "depolarizing").
+        num_qubits, min_depth, max_depth, shots, trials: Run parameters from the directory name.
+        timestamp: Time of the run (`datetime64[s]`).
+        depth, trial: Position of the row within the run.
+        true_value, noisy_value, mitigated_value, cnot_count, oneq_count: Saved values, NaN if the
+            run did not save the quantity. `mitigated_value` is the ZNE or PEC value.
+        noise_scaled_values: 2D array of the ZNE expectation values at each scale factor, padded
+            with NaN.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], signatures: Optional[Dict[str, str]] = None):
+        self.columns = columns
+        # Directory (relative to the data directory) -> signature of its file names.
+        self.signatures = {} if signatures is None else signatures
+
+    def __len__(self) -> int:
+        return len(self.columns["run"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def mask(self, **filters: Any) -> np.ndarray:
+        """Boolean mask of the rows matching all filters.
+
+        Each filter is a column name with either a value or a list/tuple/set of accepted values.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                mask &= np.isin(self.columns[column], list(value))
+            else:
+                mask &= self.columns[column] == value
+        return mask
+
+    def query(self, *columns: str, **filters: Any) -> Tuple[np.ndarray, ...]:
+        """Aligned arrays of the requested columns for the rows matching `filters` (see `mask`)."""
+        mask = self.mask(**filters)
+        return tuple(self.columns[column][mask] for column in columns)
+
+    def runs(self, **filters: Any) -> Dict[str, np.ndarray]:
+        """Run-level columns, with one entry per run matching `filters`."""
+        mask = self.mask(**filters)
+        _, first = np.unique(self.columns["run"][mask], return_index=True)
+        return {column: self.columns[column][mask][np.sort(first)] for column in RUN_COLUMNS}
+
+    def save(self, path: str = CATALOG_PATH) -> None:
+        dirs = sorted(self.signatures)
+        np.savez_compressed(
+            path,
+            _dirs=np.array(dirs, dtype=str),
+            _signatures=np.array([self.signatures[d] for d in dirs], dtype=str),
+            **self.columns,
+        )
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "Catalog":
+        with np.load(path) as archive:
+            columns = {key: archive[key] for key in archive.files if not key.startswith("_")}
+            signatures = dict(zip(archive["_dirs"].tolist(), archive["_signatures"].tolist()))
+        return cls(columns, signatures)
+
+
+def build_catalog(data_dir: str = DATA_DIR, path: Optional[str] = CATALOG_PATH) -> Catalog:
+    """Index all runs under `data_dir`, reusing the catalog stored at `path`.
+
+    Only directories that are new, or whose file names changed, since the stored catalog was built
+    are parsed. Rows of directories that no longer exist are dropped. If `path` is `None`, the
+    catalog is built from scratch and not saved.
+    """
+    old = Catalog.load(path) if path is not None and os.path.exists(path) else None
+
+    current = {}
+    for dirpath, _, filenames in os.walk(data_dir):
+        files = sorted(f for f in filenames if f.endswith(".txt"))
+        if files:
+            current[os.path.relpath(dirpath, data_dir)] = _signature(files)
+
+    kept, new_chunks = [], []
+    for rel_dir, signature in sorted(current.items()):
+        if old is not None and old.signatures.get(rel_dir) == signature:
+            kept.append(rel_dir)
+        else:
+            new_chunks.extend(parse_run_directory(data_dir, rel_dir))
+    print(f"Indexed {len(current) - len(kept)} new or changed directories, reused {len(kept)}.")
+
+    chunks = new_chunks
+    if old is not None and len(old):
+        chunks = [{k: v[np.isin(old["path"], kept)] for k, v in old.columns.items()}] + new_chunks
+    catalog = Catalog(_concatenate(chunks), current)
+    if path is not None:
+        catalog.save(path)
+    return catalog
+
+
+def parse_run_directory(data_dir: str, rel_dir: str) -> List[Dict[str, np.ndarray]]:
+    """Columns of all runs saved in a directory, one dictionary per run.
+
+    Files are grouped into runs by their timestamp. A quantity saved only once in the directory is
+    shared by all of its runs, since some runs reuse the `true_values` of an earlier run.
+    """
+    name = os.path.basename(rel_dir)
+    match = next((m for m in (p.match(name) for p in DIR_PATTERNS) if m), None)
+    if match is None:
+        print(f"Skipping {rel_dir}: unrecognized directory name.")
+        return []
+    params = match.groupdict()
+
+    files = {}
+    for filename in sorted(os.listdir(os.path.join(data_dir, rel_dir))):
+        file_match = FILE_PATTERN.match(filename)
+        if file_match is None:
+            continue
+        fields = file_match.groupdict()
+        timestamp = datetime.strptime(
+            "{weekday} {month} {day} {hour}:{minute}:{second} {year}".format(**fields), "%a %b %d %H:%M:%S %Y"
+        )
+        files.setdefault(fields["quantity"], {})[timestamp] = os.path.join(data_dir, rel_dir, filename)
+
+    # A run is identified by the timestamp of its mitigated values.
+    mitigated = files.get(f"{params['method']}_values", {})
+    parts = rel_dir.split(os.sep)
+    platform = parts[0] if parts[0] in ("hardware", "simulator") else ""
+
+    chunks = []
+    for timestamp in sorted(mitigated):
+        values = {}
+        for quantity in list(VALUE_FILES) + [SCALED_VALUES_FILE]:
+            candidates = files.get(quantity, {})
+            filepath = candidates.get(timestamp)
+            if filepath is None and len(candidates) == 1:
+                filepath, = candidates.values()
+            if filepath is not None:
+                # PEC runs save empty noise-scaled value files.
+                with warnings.catch_warnings():
+                    warnings.filterwarnings("ignore", message="loadtxt: input contained no data")
+                    values[quantity] = np.loadtxt(filepath, ndmin=2)
+
+        num_depths, trials = values[f"{params['method']}_values"].shape
+        depths = _depths(int(params["min_depth"]), int(params["max_depth"]), num_depths)
+        num_rows = num_depths * trials
+
+        chunk = {
+            "run": np.full(num_rows, f"{rel_dir}@{timestamp.isoformat()}"),
+            "path": np.full(num_rows, rel_dir),
+            "platform": np.full(num_rows, platform),
+            "method": np.full(num_rows, params["method"]),
+            "benchmark": np.full(num_rows, params["benchmark"]),
+            "device": np.full(num_rows, params["device"]),
+            "timestamp": np.full(num_rows, np.datetime64(timestamp, "s")),
+            "depth": np.repeat(depths, trials),
+            "trial": np.tile(np.arange(trials), num_depths),
+        }
+        for key in ("num_qubits", "min_depth", "max_depth", "shots", "trials"):
+            chunk[key] = np.full(num_rows, int(params[key]))
+        for quantity, column in VALUE_FILES.items():
+            if quantity in values:
+                chunk[column] = values[quantity].reshape(num_rows).astype(float)
+            elif column not in chunk:
+                chunk[column] = np.full(num_rows, np.nan)
+        # ZNE saves the scale-factor values of each trial consecutively on the row of each depth.
+        scaled = values.get(SCALED_VALUES_FILE)
+        if scaled is not None and scaled.size:
+            chunk["noise_scaled_values"] = scaled.reshape(num_rows, -1)
+        else:
+            chunk["noise_scaled_values"] = np.full((num_rows, 0), np.nan)
+        chunks.append(chunk)
+    return chunks
+
+
+def _depths(min_depth: int, max_depth: int, num_depths: int) -> np.ndarray:
+    """Depths of a run, `range(min_depth, max_depth + 1, step_depth)` for the step that fits."""
+    for step in range(1, max_depth - min_depth + 2):
+        depths = np.arange(min_depth, max_depth + 1, step)
+        if len(depths) == num_depths:
+            return depths
+    raise ValueError(f"No depth step gives {num_depths} depths between {min_depth} and {max_depth}.")
+
+
+def _signature(filenames: List[str]) -> str:
+    return hashlib.sha256("\n".join(filenames).encode()).hexdigest()
+
+
+def _concatenate(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not chunks:
+        columns = {column: np.array([], dtype=str) for column in RUN_COLUMNS + ROW_COLUMNS}
+        columns["noise_scaled_values"] = np.empty((0, 0))
+        return columns
+
+    columns = {}
+    for column in chunks[0]:
+        if column == "noise_scaled_values":
+            # Pad to the largest number of scale factors.
+            width = max(chunk[column].shape[1] for chunk in chunks)
+            columns[column] = np.concatenate([
+                np.pad(chunk[column], ((0, 0), (0, width - chunk[column].shape[1])), constant_values=np.nan)
+                for chunk in chunks
+            ])
+        else:
+            columns[column] = np.concatenate([chunk[column] for chunk in chunks])
+    return columns
@@ -0,0 +1,304 @@
+"""Parallel, cached circuit compilation for the `execute` function of `pec_and_zne.ipynb`.
+
+Compiling a circuit for IBMQ (`qiskit.transpile`) or Rigetti (gateset and qubit compilation into a
+verbatim box) is done once per (circuit fingerprint, backend, layout, optimization level) and
+persisted on disk, so ZNE-folded circuits and repeated RB/mirror seeds are only compiled the first
+time they are seen. Cache misses are compiled on a process pool.
+
+Usage in `pec_and_zne.ipynb`, replacing the per-circuit compilation loops of `execute`:
+
+    from compilation import compile_circuits
+
+    layout = physical_ibm_qubits if hardware_type == "ibmq" else rigetti_qubit_mapping
+    to_run, stats = compile_circuits(circuits, hardware_type, backend=backend, layout=layout)
+    print(stats)
+"""
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import qiskit
+from braket.circuits import Circuit, gates
+
+from multiplicity import circuit_key
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".compilation_cache")
+
+# Compiled circuits depend on the compilers, so upgrading either library invalidates the cache.
+_LIBRARY_VERSIONS = (qiskit.__version__, importlib.metadata.version("amazon-braket-sdk"))
+
+
+@dataclass
+class CompileStats:
+    """Compile-time metrics of a call to `compile_circuits`."""
+    num_circuits: int = 0
+    cache_hits: int = 0
+    # Distinct circuits that were compiled.
+    cache_misses: int = 0
+    # Repeats of a circuit compiled earlier in the same call.
+    duplicates: int = 0
+    # Sum of the compilation times of the individual circuits (over all workers).
+    compile_seconds: float = 0.0
+    # Wall-clock time of the whole call, including cache lookups.
+    wall_seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Compiled {self.num_circuits} circuit(s): {self.cache_hits} cache hit(s), "
+            f"{self.cache_misses} miss(es), {self.duplicates} duplicate(s) of a miss, "
+            f"{self.compile_seconds:.2f} s compiling, "
+            f"{self.wall_seconds:.2f} s wall time."
+        )
+
+
+def compile_to_rigetti_qubits(circuit: Circuit, rigetti_qubit_mapping: Dict[int, int]) -> Circuit:
+    compiled = Circuit()
+    for instr in circuit.instructions:
+        braket_qubits = instr.target
+        rigetti_qubits = braket_qubits.map(rigetti_qubit_mapping)
+        compiled.add_instruction(gates.Instruction(instr.operator, rigetti_qubits))
+    return compiled
+
+
+def compile_to_rigetti_gateset(circuit: Circuit) -> Circuit:
+    """Compiles AWS gates to Rigetti gateset. Taken from:
+    https://mitiq.readthedocs.io/en/stable/examples/braket_mirror_circuit.html"""
+    compiled = Circuit()
+
+    for instr in circuit.instructions:
+        if isinstance(instr.operator, gates.Vi):
+            compiled.add_instruction(gates.Instruction(gates.Rx(-np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.V):
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.Ry):
+            compiled.add_instruction(gates.Instruction(gates.Rx(-np.pi / 2), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rz(-instr.operator.angle), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.Y):
+            compiled.add_instruction(gates.Instruction(gates.Rx(-np.pi / 2), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.X):
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi), instr.target))
+        elif isinstance(instr.operator, gates.Z):
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi), instr.target))
+        elif isinstance(instr.operator, gates.S):
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.Si):
+            compiled.add_instruction(gates.Instruction(gates.Rz(-np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.H):
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target))
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target))
+        elif isinstance(instr.operator, gates.CNot):
+            # First Hadamard
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target[1]))
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target[1]))
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target[1]))
+
+            # Controlled-Z
+            compiled.add_instruction(gates.Instruction(gates.CZ(), instr.target))
+
+            # Second Hadamard
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target[1]))
+            compiled.add_instruction(gates.Instruction(gates.Rx(np.pi / 2), instr.target[1]))
+            compiled.add_instruction(gates.Instruction(gates.Rz(np.pi / 2), instr.target[1]))
+        else:
+            compiled.add_instruction(instr)
+
+    return compiled
+
+
+def compile_circuit(
+    circuit: Union[qiskit.QuantumCircuit, Circuit],
+    hardware_type: str,
+    backend: Any = None,
+    layout: Optional[Union[List[int], Dict[int, int]]] = None,
+    optimization_level: int = 0,
+) -> Union[qiskit.QuantumCircuit, Circuit]:
+    """Compile a single circuit the same way as the `execute` function of the notebook.
+
+    Args:
+        circuit: Qiskit circuit (IBMQ) or Braket circuit (Rigetti).
+        hardware_type: Either "ibmq" or "rigetti".
+        backend: Qiskit backend to transpile for (IBMQ only), e.g. a fake backend.
+        layout: Physical IBM qubits (IBMQ) or the Rigetti qubit mapping.
+        optimization_level: Qiskit optimization level. The default of 0 keeps RB circuits from
+            being simplified to empty circuits.
+    Returns:
+        The compiled circuit, ready to be run.
+    """
+    if hardware_type == "ibmq":
+        circuit_to_run = circuit.copy()
+        circuit_to_run.measure_all()
+        return qiskit.transpile(
+            circuit_to_run,
+            backend=backend,
+            initial_layout=layout,
+            optimization_level=optimization_level,
+        )
+    elif hardware_type == "rigetti":
+        compiled_circuit = compile_to_rigetti_gateset(circuit)
+        circuit_with_compiled_qubits = compile_to_rigetti_qubits(compiled_circuit, layout)
+        return Circuit().add_verbatim_box(circuit_with_compiled_qubits)
+    raise ValueError(f"Compilation for hardware type {hardware_type} is not supported.")
+
+
+def cache_key(
+    circuit: Union[qiskit.QuantumCircuit, Circuit],
+    hardware_type: str,
+    backend: Any = None,
+    layout: Optional[Union[List[int], Dict[int, int]]] = None,
+    optimization_level: int = 0,
+) -> str:
+    """Hash of (circuit fingerprint, backend target, layout, optimization level, library versions).
+
+    The circuit fingerprint is `multiplicity.circuit_key`, which keeps every parameter and matrix.
+    The backend is identified by its name, version, coupling map and the calibrated duration and
+    error of each instruction, so a recalibrated or re-targeted backend is compiled anew.
+    """
+    layout_key = sorted(layout.items()) if isinstance(layout, dict) else layout
+    key = (
+        circuit_key(circuit),
+        hardware_type,
+        _backend_fingerprint(backend),
+        layout_key,
+        optimization_level,
+        _LIBRARY_VERSIONS,
+    )
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def compile_circuits(
+    circuits: List[Union[qiskit.QuantumCircuit, Circuit]],
+    hardware_type: str,
+    backend: Any = None,
+    layout: Optional[Union[List[int], Dict[int, int]]] = None,
+    optimization_level: int = 0,
+    cache_dir: Optional[str] = CACHE_DIR,
+    max_workers: Optional[int] = None,
+) -> Tuple[List[Union[qiskit.QuantumCircuit, Circuit]], CompileStats]:
+    """Compile circuits on a process pool, reusing compiled circuits cached on disk.
+
+    Args:
+        circuits: Circuits to compile.
+        hardware_type: Either "ibmq" or "rigetti".
+        backend: Qiskit backend to transpile for (IBMQ only). It is sent to every worker process,
+            so it must be picklable unless `max_workers=1`.
+        layout: Physical IBM qubits (IBMQ) or the Rigetti qubit mapping.
+        optimization_level: Qiskit optimization level.
+        cache_dir: Directory of the on-disk cache. If `None`, nothing is cached.
+        max_workers: Number of worker processes. With 1, circuits are compiled in this process.
+    Returns:
+        The compiled circuits, in the same order as `circuits`, and compile-time metrics.
+    """
+    start = time.perf_counter()
+    stats = CompileStats(num_circuits=len(circuits))
+    compiled = [None] * len(circuits)
+
+    # Look up all circuits in the cache, keeping one entry per distinct missing key.
+    misses = {}
+    for i, circuit in enumerate(circuits):
+        key = cache_key(circuit, hardware_type, backend, layout, optimization_level)
+        if key in misses:
+            misses[key].append(i)
+            stats.duplicates += 1
+            continue
+        cached = _load(cache_dir, key)
+        if cached is not None:
+            compiled[i] = cached
+            stats.cache_hits += 1
+        else:
+            misses[key] = [i]
+            stats.cache_misses += 1
+
+    keys = list(misses)
+    to_compile = [circuits[misses[key][0]] for key in keys]
+    if max_workers == 1 or len(to_compile) <= 1:
+        _init_worker(hardware_type, backend, layout, optimization_level)
+        results = [_compile_task(circuit) for circuit in to_compile]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(hardware_type, backend, layout, optimization_level),
+        ) as pool:
+            results = list(pool.map(_compile_task, to_compile))
+
+    for key, (compiled_circuit, seconds) in zip(keys, results):
+        _store(cache_dir, key, compiled_circuit)
+        stats.compile_seconds += seconds
+        for i in misses[key]:
+            compiled[i] = compiled_circuit
+
+    stats.wall_seconds = time.perf_counter() - start
+    return compiled, stats
+
+
+def _backend_fingerprint(backend: Any) -> Optional[tuple]:
+    if backend is None:
+        return None
+    name = backend.name
+    name = name() if callable(name) else name
+    target = getattr(backend, "target", None)
+    if target is None:
+        coupling_map = getattr(backend, "coupling_map", None)
+        edges = sorted(coupling_map.get_edges()) if coupling_map is not None else None
+        return name, getattr(backend, "backend_version", None), edges
+    instructions = sorted(
+        (
+            (op, None if qargs is None else tuple(qargs), None if props is None else (props.duration, props.error))
+            for op, qargs_props in target.items()
+            for qargs, props in (qargs_props or {None: None}).items()
+        ),
+        key=repr,
+    )
+    return name, getattr(backend, "backend_version", None), target.num_qubits, target.dt, tuple(instructions)
+
+
+def _load(cache_dir: Optional[str], key: str) -> Optional[Union[qiskit.QuantumCircuit, Circuit]]:
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, f"{key}.pickle")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as handle:
+        return pickle.load(handle)
+
+
+def _store(cache_dir: Optional[str], key: str, compiled_circuit: Union[qiskit.QuantumCircuit, Circuit]) -> None:
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.pickle")
+    # Write to a temporary file first so that concurrent runs never read a partial pickle.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        pickle.dump(compiled_circuit, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+# Compilation settings of each worker process, set once by `_init_worker`.
+_WORKER = {}
+
+
+def _init_worker(hardware_type, backend, layout, optimization_level):
+    _WORKER.update(
+        hardware_type=hardware_type,
+        backend=backend,
+        layout=layout,
+        optimization_level=optimization_level,
+    )
+
+
+def _compile_task(circuit):
+    start = time.perf_counter()
+    compiled_circuit = compile_circuit(circuit, **_WORKER)
+    return compiled_circuit, time.perf_counter() - start
@@ -0,0 +1,141 @@
+"""Multiplicity-aware grouping of PEC-sampled circuits.
+
+`pec.execute_with_pec` hands the executor `num_samples` sampled circuits, many of which are
+identical because low-probability correction terms are rarely drawn. Instead of compiling and
+submitting every copy, identical circuits are merged into a single submission whose shots are
+scaled by the number of copies, and the results are expanded back to one value per sample.
+
+Usage in `pec_and_zne.ipynb`, where wrapping the executor in a `mitiq.Executor` with
+`max_batch_size=num_samples` lets all samples be grouped together rather than in batches of 75:
+
+    from mitiq import Executor
+    from multiplicity import execute_grouped
+
+    pec_executor = Executor(
+        functools.partial(
+            execute_grouped,
+            execute=execute,
+            shots=shots // num_samples,
+            backend=noisy_backend,
+            correct_bitstring=correct_bitstring,
+            verbose=verbose,
+        ),
+        max_batch_size=num_samples,
+    )
+"""
+from collections import defaultdict
+from typing import Any, Callable, Hashable, List, Tuple
+
+import numpy as np
+import qiskit
+from qiskit.circuit.library import get_standard_gate_name_mapping
+from braket.circuits import Circuit
+from mitiq.interface import convert_to_mitiq
+
+
+def circuit_key(circuit: Any) -> Hashable:
+    """Canonical, hashable representation of a Qiskit, Braket or Cirq circuit.
+
+    Two circuits have the same key only if they apply the same operations, with the same
+    parameters and matrices, to the same qubits.
+    """
+    if isinstance(circuit, qiskit.QuantumCircuit):
+        return (circuit.num_qubits, circuit.num_clbits) + tuple(
+            (
+                _operation_key(instr.operation),
+                tuple(circuit.find_bit(q).index for q in instr.qubits),
+                tuple(circuit.find_bit(c).index for c in instr.clbits),
+            )
+            for instr in circuit.data
+        )
+    if isinstance(circuit, Circuit):
+        # The OpenQASM program holds every parameter, matrix and gate modifier at full precision.
+        return circuit.to_ir().source
+    cirq_circuit, _ = convert_to_mitiq(circuit)
+    return repr(cirq_circuit)
+
+
+def _operation_key(operation: qiskit.circuit.Operation) -> Hashable:
+    key = (
+        operation.name,
+        operation.num_qubits,
+        operation.num_clbits,
+        tuple(_parameter_key(p) for p in getattr(operation, "params", [])),
+        getattr(operation, "ctrl_state", None),
+    )
+    if operation.name not in _STANDARD_GATES and getattr(operation, "definition", None) is not None:
+        # Custom gates are only identified by their name, so include what they do.
+        key += (circuit_key(operation.definition),)
+    return key
+
+
+def _parameter_key(param: Any) -> Hashable:
+    if isinstance(param, np.ndarray):
+        return (param.shape, str(param.dtype), param.tobytes())
+    if isinstance(param, (int, float, np.integer, np.floating)):
+        return float(param)
+    if isinstance(param, (complex, np.complexfloating)):
+        return complex(param)
+    return repr(param)
+
+
+_STANDARD_GATES = frozenset(get_standard_gate_name_mapping())
+
+
+def group_circuits(circuits: List[Any]) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+    """Merge identical circuits.
+
+    Returns:
+        The distinct circuits (in order of first appearance), the index of the distinct circuit
+        for each input circuit, and the multiplicity of each distinct circuit.
+    """
+    unique, indices, seen = [], [], {}
+    for circuit in circuits:
+        key = circuit_key(circuit)
+        if key not in seen:
+            seen[key] = len(unique)
+            unique.append(circuit)
+        indices.append(seen[key])
+    indices = np.array(indices, dtype=int)
+    return unique, indices, np.bincount(indices, minlength=len(unique))
+
+
+def execute_grouped(
+    circuits: List[Any],
+    execute: Callable[..., List[float]],
+    shots: int,
+    **execute_kwargs,
+) -> List[float]:
+    """Executes each distinct circuit once, with `shots` scaled by its multiplicity.
+
+    Circuits with the same multiplicity are passed to `execute` in a single call, so a batch of
+    sampled circuits costs one call per distinct multiplicity instead of one compilation and
+    submission per sample.
+
+    Args:
+        circuits: Circuit(s) to execute, e.g. the samples generated by `pec.execute_with_pec`.
+        execute: Executor taking a list of circuits and a `shots` argument, returning one
+            expectation value per circuit (the `execute` function of `pec_and_zne.ipynb`).
+        shots: Number of shots per sampled circuit.
+        execute_kwargs: Further keyword arguments passed to `execute`. With `verbose=True`, the
+            grouping of each call is printed as well.
+    Returns:
+        One expectation value per input circuit, in the original order.
+    """
+    if not isinstance(circuits, list):
+        circuits = [circuits]
+
+    unique, indices, multiplicities = group_circuits(circuits)
+    if execute_kwargs.get("verbose", False):
+        print(f"Grouped {len(circuits)} circuit(s) into {len(unique)} distinct circuit(s).")
+
+    by_multiplicity = defaultdict(list)
+    for i, multiplicity in enumerate(multiplicities):
+        by_multiplicity[multiplicity].append(i)
+
+    unique_values = np.zeros(len(unique))
+    for multiplicity, group in by_multiplicity.items():
+        results = execute([unique[i] for i in group], shots=int(multiplicity) * shots, **execute_kwargs)
+        unique_values[group] = results
+
+    return unique_values[indices].tolist()
@@ -0,0 +1,42 @@
+"""Tests of the on-disk cache of compiled circuits."""
+import numpy as np
+import qiskit
+from braket.circuits import Circuit
+from qiskit.providers.fake_provider import GenericBackendV2
+
+from compilation import cache_key, compile_circuits
+
+
+RIGETTI_LAYOUT = {0: 10, 1: 11}
+
+
+def test_distinct_unitaries_are_compiled_separately(tmp_path):
+    circuits = [
+        Circuit().unitary(matrix=np.eye(2), targets=[0]),
+        Circuit().unitary(matrix=np.array([[0, 1], [1, 0]]), targets=[0]),
+    ]
+    compiled, stats = compile_circuits(circuits, "rigetti", layout=RIGETTI_LAYOUT, cache_dir=str(tmp_path), max_workers=1)
+    assert (stats.cache_misses, stats.duplicates) == (2, 0)
+    assert compiled[0].to_ir().source != compiled[1].to_ir().source
+
+    # Reading them back from disk gives the same circuits.
+    cached, stats = compile_circuits(circuits, "rigetti", layout=RIGETTI_LAYOUT, cache_dir=str(tmp_path), max_workers=1)
+    assert stats.cache_hits == 2
+    assert [c.to_ir().source for c in cached] == [c.to_ir().source for c in compiled]
+
+
+def test_duplicates_are_counted_once():
+    circuits = [Circuit().h(0).cnot(0, 1), Circuit().h(0).cnot(0, 1), Circuit().x(0)]
+    compiled, stats = compile_circuits(circuits, "rigetti", layout=RIGETTI_LAYOUT, cache_dir=None, max_workers=1)
+    assert (stats.cache_hits, stats.cache_misses, stats.duplicates) == (0, 2, 1)
+    assert compiled[0] is compiled[1]
+
+
+def test_key_depends_on_backend_calibration():
+    circuit = qiskit.QuantumCircuit(2)
+    circuit.cx(0, 1)
+    keys = {
+        cache_key(circuit, "ibmq", backend=GenericBackendV2(2, seed=seed), layout=[0, 1])
+        for seed in (0, 0, 1)
+    }
+    assert len(keys) == 2
@@ -0,0 +1,54 @@
+"""Tests of the circuit keys used to merge PEC samples and to cache compiled circuits."""
+import numpy as np
+import qiskit
+from braket.circuits import Circuit
+from qiskit.circuit.library import UnitaryGate
+
+from multiplicity import circuit_key, execute_grouped, group_circuits
+
+
+IDENTITY = np.eye(2)
+PAULI_X = np.array([[0, 1], [1, 0]])
+
+
+def test_braket_unitaries_are_not_merged():
+    circuits = [Circuit().unitary(matrix=IDENTITY, targets=[0]), Circuit().unitary(matrix=PAULI_X, targets=[0])]
+    unique, indices, multiplicities = group_circuits(circuits)
+    assert len(unique) == 2
+    assert indices.tolist() == [0, 1]
+    assert multiplicities.tolist() == [1, 1]
+
+
+def test_braket_parameters_and_modifiers_are_keyed():
+    assert circuit_key(Circuit().u(0, 0.1, 0.2, 0.3)) != circuit_key(Circuit().u(0, 0.5, 0.2, 0.3))
+    assert circuit_key(Circuit().x(1, control=0)) != circuit_key(Circuit().x(1, control=0, control_state=0))
+    assert circuit_key(Circuit().x(1, control=0)) != circuit_key(Circuit().x(1, control=0, power=0.5))
+
+
+def test_qiskit_unitaries_are_not_merged():
+    # Large matrices are summarized by `str`, so they must be keyed by their bytes.
+    identity, permutation = np.eye(64), np.eye(64)[[1, 0, *range(2, 64)]]
+    circuits = []
+    for matrix in [IDENTITY, PAULI_X]:
+        circuit = qiskit.QuantumCircuit(1)
+        circuit.append(UnitaryGate(matrix), [0])
+        circuits.append(circuit)
+    for matrix in [identity, permutation]:
+        circuit = qiskit.QuantumCircuit(6)
+        circuit.append(UnitaryGate(matrix), range(6))
+        circuits.append(circuit)
+    assert len({circuit_key(circuit) for circuit in circuits}) == 4
+
+
+def test_identical_circuits_are_merged():
+    circuits = [Circuit().h(0).cnot(0, 1), Circuit().x(0), Circuit().h(0).cnot(0, 1)]
+    unique, indices, multiplicities = group_circuits(circuits)
+    assert len(unique) == 2
+    assert indices.tolist() == [0, 1, 0]
+    assert multiplicities.tolist() == [2, 1]
+
+
+def test_execute_grouped_scales_shots_by_multiplicity():
+    circuits = [Circuit().x(0), Circuit().x(0), Circuit().h(0)]
+    values = execute_grouped(circuits, lambda batch, shots: [float(shots)] * len(batch), shots=10)
+    assert values == [20.0, 20.0, 10.0]
@@ -0,0 +1,260 @@
+"""In-memory conversion of Qrack circuits to Qiskit and tensorcircuit.
+
+pyqrack can only hand a circuit to other simulators through a file (`out_to_file` followed by
+`file_to_qiskit_circuit`), which dominates the cost of converting thousands of circuits and makes
+parallel workers collide on the file name. `RecordedCircuit` exposes the gate methods of
+`QrackCircuit` (`mtrx`, `ucmtrx`, `swap`) and of `QrackSimulator` used by the scripts (`h`, `s`,
+`u`, `mcx`, `iswap`, ...), so the circuit generators can write into it directly:
+
+    from circuit_conversion import RecordedCircuit
+
+    circ = random_circuit(width, RecordedCircuit(width))
+    qiskit_circuit = circ.to_qiskit()
+    tc_circuit = circ.to_tensorcircuit()
+    circ.run(QrackSimulator(width))
+
+Circuits that were already saved with `QrackCircuit.out_to_file` (e.g. `heat_map_circuits/`) are
+read with `load_circuit`, which parses all gate payloads of a file in a few NumPy calls.
+
+Every gate is stored the way Qrack stores it: a target qubit, a list of control qubits, and one
+2x2 payload per control permutation (bit `i` of the permutation is the state of control `i`).
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+SQRT1_2 = 1 / math.sqrt(2)
+
+I = np.eye(2, dtype=complex)
+X = np.array([[0, 1], [1, 0]], dtype=complex)
+Y = np.array([[0, -1j], [1j, 0]], dtype=complex)
+Z = np.array([[1, 0], [0, -1]], dtype=complex)
+H = np.array([[SQRT1_2, SQRT1_2], [SQRT1_2, -SQRT1_2]], dtype=complex)
+S = np.array([[1, 0], [0, 1j]], dtype=complex)
+ADJS = np.array([[1, 0], [0, -1j]], dtype=complex)
+
+# Payloads converted to named gates rather than to generic unitaries.
+NAMED_GATES = {"x": X, "y": Y, "z": Z, "h": H, "s": S, "sdg": ADJS}
+
+
+class RecordedCircuit:
+    """Circuit of uniformly controlled single-qubit gates, recorded in memory.
+
+    Args:
+        num_qubits: Number of qubits. Gates on higher qubits extend the circuit, as in Qrack.
+    """
+
+    def __init__(self, num_qubits: int = 0):
+        self.num_qubits = num_qubits
+        self.targets: List[int] = []
+        self.controls: List[List[int]] = []
+        self.payloads: List[Dict[int, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def get_qubit_count(self) -> int:
+        return self.num_qubits
+
+    def prefix(self, num_gates: int) -> "RecordedCircuit":
+        """Circuit of the first `num_gates` gates, e.g. the first layers of a layered circuit."""
+        out = RecordedCircuit(self.num_qubits)
+        out.targets = self.targets[:num_gates]
+        out.controls = self.controls[:num_gates]
+        out.payloads = self.payloads[:num_gates]
+        return out
+
+    # QrackCircuit gates.
+
+    def mtrx(self, m: Sequence[complex], q: int) -> None:
+        self._append(q, [], {0: np.reshape(np.asarray(m, dtype=complex)[:4], (2, 2))})
+
+    def ucmtrx(self, c: Sequence[int], m: Sequence[complex], q: int, p: int) -> None:
+        self._append(q, list(c), {p: np.reshape(np.asarray(m, dtype=complex)[:4], (2, 2))})
+
+    def swap(self, q1: int, q2: int) -> None:
+        self.mcx([q1], q2)
+        self.mcx([q2], q1)
+        self.mcx([q1], q2)
+
+    # QrackSimulator gates.
+
+    def h(self, q: int) -> None:
+        self._append(q, [], {0: H})
+
+    def x(self, q: int) -> None:
+        self._append(q, [], {0: X})
+
+    def y(self, q: int) -> None:
+        self._append(q, [], {0: Y})
+
+    def z(self, q: int) -> None:
+        self._append(q, [], {0: Z})
+
+    def s(self, q: int) -> None:
+        self._append(q, [], {0: S})
+
+    def adjs(self, q: int) -> None:
+        self._append(q, [], {0: ADJS})
+
+    def u(self, q: int, th: float, ph: float, lm: float) -> None:
+        c = math.cos(th / 2)
+        s = math.sin(th / 2)
+        self.mtrx([c, -np.exp(1j * lm) * s, np.exp(1j * ph) * s, np.exp(1j * (ph + lm)) * c], q)
+
+    def mcx(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {(1 << len(c)) - 1: X})
+
+    def mcy(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {(1 << len(c)) - 1: Y})
+
+    def mcz(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {(1 << len(c)) - 1: Z})
+
+    def macx(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {0: X})
+
+    def macy(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {0: Y})
+
+    def macz(self, c: Sequence[int], q: int) -> None:
+        self._append(q, list(c), {0: Z})
+
+    def iswap(self, q1: int, q2: int) -> None:
+        # iSWAP = (S ⊗ S) SWAP CZ
+        self.mcz([q1], q2)
+        self.swap(q1, q2)
+        self.s(q1)
+        self.s(q2)
+
+    def adjiswap(self, q1: int, q2: int) -> None:
+        self.adjs(q2)
+        self.adjs(q1)
+        self.swap(q1, q2)
+        self.mcz([q1], q2)
+
+    # Conversions.
+
+    def run(self, qrack) -> None:
+        """Apply the gates to a `QrackSimulator`, or append them to a `QrackCircuit`."""
+        for target, controls, payloads in zip(self.targets, self.controls, self.payloads):
+            for perm, payload in payloads.items():
+                if controls:
+                    qrack.ucmtrx(controls, payload.ravel().tolist(), target, perm)
+                else:
+                    qrack.mtrx(payload.ravel().tolist(), target)
+
+    def to_qiskit(self):
+        """Qiskit `QuantumCircuit` with the same gates."""
+        from qiskit import QuantumCircuit
+        from qiskit.circuit.library import HGate, SdgGate, SGate, UnitaryGate, XGate, YGate, ZGate
+
+        named = {"x": XGate(), "y": YGate(), "z": ZGate(), "h": HGate(), "s": SGate(), "sdg": SdgGate()}
+        controlled = {}
+        circ = QuantumCircuit(self.num_qubits)
+        for target, controls, payloads in zip(self.targets, self.controls, self.payloads):
+            name = _gate_name(payloads)
+            if name is not None:
+                perm, = payloads
+                gate = named[name]
+                if controls:
+                    # Building a controlled gate is slow, so build each kind only once.
+                    key = (name, len(controls), perm)
+                    if key not in controlled:
+                        controlled[key] = gate.control(len(controls), ctrl_state=perm)
+                    gate = controlled[key]
+                circ.append(gate, controls + [target])
+            else:
+                # Qiskit is little-endian, so the target is the least significant qubit.
+                circ.append(UnitaryGate(_block_diagonal(payloads, len(controls)), check_input=False),
+                            [target] + controls)
+        return circ
+
+    def to_tensorcircuit(self):
+        """tensorcircuit `Circuit` with the same gates."""
+        import tensorcircuit as tc
+
+        circ = tc.Circuit(self.num_qubits)
+        for target, controls, payloads in zip(self.targets, self.controls, self.payloads):
+            name = _gate_name(payloads)
+            if name is not None and not controls:
+                getattr(circ, "sd" if name == "sdg" else name)(target)
+            else:
+                # tensorcircuit is big-endian, so the target goes last and the controls in reverse order.
+                circ.any(*controls[::-1], target, unitary=_block_diagonal(payloads, len(controls)))
+        return circ
+
+    def _append(self, q: int, c: List[int], payloads: Dict[int, np.ndarray]) -> None:
+        self.num_qubits = max(self.num_qubits, q + 1, *(qc + 1 for qc in c))
+        self.targets.append(q)
+        self.controls.append(c)
+        self.payloads.append(payloads)
+
+
+def load_circuit(filename: str) -> RecordedCircuit:
+    """Read a circuit saved with `QrackCircuit.out_to_file`.
+
+    The file is a list of whitespace-separated integers (qubit count, gate count, and for each
+    gate its target, controls and payload permutations) interleaved with `(re,im)` payload
+    entries. All payload entries are parsed at once, and payloads are made exactly unitary the
+    same way as in `QrackCircuit.file_to_qiskit_circuit`.
+    """
+    with open(filename, "r") as file:
+        tokens = np.array(file.read().split())
+
+    is_amplitude = np.char.startswith(tokens, "(")
+    amplitudes = " ".join(tokens[is_amplitude]).replace("(", "").replace(")", "").replace(",", " ")
+    parts = np.array(amplitudes.split(), dtype=float).reshape(-1, 2)
+    payloads = _unitarize((parts[:, 0] + 1j * parts[:, 1]).reshape(-1, 2, 2))
+    ints = tokens[~is_amplitude].astype(np.int64).tolist()
+
+    circ = RecordedCircuit(ints[0])
+    num_gates = ints[1]
+    i, p = 2, 0
+    for _ in range(num_gates):
+        target, control_count = ints[i], ints[i + 1]
+        controls = ints[i + 2:i + 2 + control_count]
+        i += 2 + control_count
+        payload_count = ints[i]
+        keys = ints[i + 1:i + 1 + payload_count]
+        i += 1 + payload_count
+        circ._append(target, controls, dict(zip(keys, payloads[p:p + payload_count])))
+        p += payload_count
+    return circ
+
+
+def _unitarize(ops: np.ndarray) -> np.ndarray:
+    """Normalize the first row of each 2x2 matrix and complete it to a unitary with the same phase."""
+    a = ops[:, 0, :] / np.linalg.norm(ops[:, 0, :], axis=1, keepdims=True)
+    phase = np.exp(1j * np.angle(np.linalg.det(ops)))
+    out = np.empty_like(ops)
+    out[:, 0, :] = a
+    out[:, 1, 0] = -phase * np.conj(a[:, 1])
+    out[:, 1, 1] = phase * np.conj(a[:, 0])
+    return out
+
+
+def _gate_name(payloads: Dict[int, np.ndarray]) -> Optional[str]:
+    if len(payloads) != 1:
+        return None
+    payload, = payloads.values()
+    return _NAMES.get(_matrix_key(payload))
+
+
+def _matrix_key(matrix: np.ndarray) -> bytes:
+    # Adding 0 turns -0.0 into 0.0, so that equal matrices have equal keys.
+    return (np.round(matrix, 8) + 0.0).tobytes()
+
+
+_NAMES = {_matrix_key(matrix): name for name, matrix in NAMED_GATES.items()}
+
+
+def _block_diagonal(payloads: Dict[int, np.ndarray], num_controls: int) -> np.ndarray:
+    """Matrix of a uniformly controlled gate, with the target as least significant qubit."""
+    dim = 1 << num_controls
+    out = np.zeros((2 * dim, 2 * dim), dtype=complex)
+    for perm in range(dim):
+        out[2 * perm:2 * perm + 2, 2 * perm:2 * perm + 2] = payloads.get(perm, I)
+    return out
@@ -1,6 +1,8 @@
+import argparse
 import math
 import os
 import random
+import tempfile
 
 import numpy as np
 import tensorcircuit as tc
@@ -8,6 +10,8 @@ import tensorcircuit.compiler.simple_compiler as tcsc
 
 from pyqrack import QrackSimulator
 
+from circuit_conversion import RecordedCircuit
+
 
 width = 6
 max_magic = 8
@@ -216,19 +220,41 @@ def random_circuit(width, circ):
     return circ
 
 
-def main():
+def simulator_network(width):
+    """tensorcircuit network of the stabilizer-hybrid form Qrack exports for a random circuit.
+
+    The export adds ancillas for the non-Clifford gates, which are post-selected on 0. pyqrack can
+    only export through a file, so it goes to a private temporary directory.
+    """
     qsim = QrackSimulator(width, isSchmidtDecomposeMulti=False, isSchmidtDecompose=False, isOpenCL=False)
     random_circuit(width, qsim)
-    qsim.out_to_file('qrack_circuit.chp')
-    circ = QrackSimulator.file_to_qiskit_circuit('qrack_circuit.chp')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'qrack_circuit.chp')
+        qsim.out_to_file(path)
+        circ = QrackSimulator.file_to_qiskit_circuit(path)
+
+    net = tc.Circuit.from_qiskit(circ)
+    for b in range(width, circ.width()):
+        net.post_select(b, keep=0)
+    return net
+
+
+def recorded_network(width):
+    """tensorcircuit network of the gates of a random circuit, recorded in memory without Qrack."""
+    return random_circuit(width, RecordedCircuit(width)).to_tensorcircuit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sample a random Clifford+RZ circuit with tensorcircuit.')
+    parser.add_argument('--recorded', action='store_true',
+                        help='Convert the recorded gates instead of the stabilizer-hybrid export of QrackSimulator')
+    args = parser.parse_args()
 
     tc.set_backend("tensorflow")
     tc.set_contractor("auto")
     tc.set_dtype("complex128")
 
-    net = tc.Circuit.from_qiskit(circ)
-    for b in range(width, circ.width()):
-        net.post_select(b, keep=0)
+    net = recorded_network(width) if args.recorded else simulator_network(width)
     net = tcsc.simple_compile(net)[0]
 
     print(net.sample(allow_state=True, batch=1024, format="count_dict_bin"))
@@ -236,4 +262,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -4,6 +4,8 @@ import numpy as np
 import random
 from pyqrack import QrackCircuit
 
+from circuit_conversion import RecordedCircuit
+
 samples = 10
 widths = [25, 36, 49, 64]
 
@@ -41,67 +43,102 @@ def rand_u3(circ, q):
 
     circ.mtrx(op, q)
 
-def generate_circuits(width, depth):
-    gateSequence = [ 0, 3, 2, 1, 2, 1, 0, 3 ]
+def generate_layers(width, depth, circ, gateSequence):
+    """Append `depth` random layers to `circ`, yielding the depth after each layer.
+
+    `circ` is a `QrackCircuit`, or a `circuit_conversion.RecordedCircuit` to keep it in memory.
+    `gateSequence` is the coupler rotation, which carries over from one trial to the next.
+    """
     two_qubit_gates = mcx, mcy, mcz, macx, macy, macz
 
     # Nearest-neighbor couplers:
     row_len = math.ceil(math.sqrt(width))
 
-    time_results = []
-    fidelity_results = []
+    for i in range(depth):
+        # Single bit gates
+        for j in range(width):
+            rand_u3(circ, j)
+        
+        # Nearest-neighbor couplers:
+        ############################
+        gate = gateSequence.pop(0)
+        gateSequence.append(gate)
+
+        for row in range(1, row_len, 2):
+            for col in range(row_len):
+                temp_row = row
+                temp_col = col
+                temp_row = temp_row + (1 if (gate & 2) else -1);
+                temp_col = temp_col + (1 if (gate & 1) else 0)
+                
+                if (temp_row < 0) or (temp_col < 0) or (temp_row >= row_len) or (temp_col >= row_len):
+                    continue
+
+                b1 = row * row_len + col
+                b2 = temp_row * row_len + temp_col
+                
+                if (b1 >= width) or (b2 >= width):
+                    continue
+
+                choice = random.choice(two_qubit_gates)
+                choice(circ, b1, b2)
+
+        # Fully-connected couplers:
+        ###########################
+        # unused_bits = list(range(width))
+        # while len(unused_bits) > 1:
+        #     b1 = random.choice(unused_bits)
+        #     unused_bits.remove(b1)
+        #     b2 = random.choice(unused_bits)
+        #     unused_bits.remove(b2)
+        #
+        #     # Two bit gates
+        #     choice = random.choice(two_qubit_gates)
+        #     choice(circ, b1, b2)
+
+        yield i + 1
 
+def generate_circuits(width, depth):
+    gateSequence = [ 0, 3, 2, 1, 2, 1, 0, 3 ]
     for t in range(samples):
         circ = QrackCircuit()
-        d_time_results = []
-        d_fidelity_results = []
-        
-        for i in range(depth):
-            # Single bit gates
-            for j in range(width):
-                rand_u3(circ, j)
-            
-            # Nearest-neighbor couplers:
-            ############################
-            gate = gateSequence.pop(0)
-            gateSequence.append(gate)
-
-            for row in range(1, row_len, 2):
-                for col in range(row_len):
-                    temp_row = row
-                    temp_col = col
-                    temp_row = temp_row + (1 if (gate & 2) else -1);
-                    temp_col = temp_col + (1 if (gate & 1) else 0)
-                    
-                    if (temp_row < 0) or (temp_col < 0) or (temp_row >= row_len) or (temp_col >= row_len):
-                        continue
-
-                    b1 = row * row_len + col
-                    b2 = temp_row * row_len + temp_col
-                    
-                    if (b1 >= width) or (b2 >= width):
-                        continue
-
-                    choice = random.choice(two_qubit_gates)
-                    choice(circ, b1, b2)
-
-            # Fully-connected couplers:
-            ###########################
-            # unused_bits = list(range(width))
-            # while len(unused_bits) > 1:
-            #     b1 = random.choice(unused_bits)
-            #     unused_bits.remove(b1)
-            #     b2 = random.choice(unused_bits)
-            #     unused_bits.remove(b2)
-            #
-            #     # Two bit gates
-            #     choice = random.choice(two_qubit_gates)
-            #     choice(circ, b1, b2)
-
-            circ.out_to_file("heat_map_circuits/trial_" + str(t) + "_w" + str(width) + "_d" + str(i + 1))
-
-if not os.path.exists("heat_map_circuits"):
-   os.makedirs("heat_map_circuits")
-
-for n in widths:
-    generate_circuits(n, n)
+        for d in generate_layers(width, depth, circ, gateSequence):
+            circ.out_to_file("heat_map_circuits/trial_" + str(t) + "_w" + str(width) + "_d" + str(d))
+
+def generate_recorded_circuits(width, depth):
+    """In-memory version of `generate_circuits`: for each trial, the circuit at each depth."""
+    gateSequence = [ 0, 3, 2, 1, 2, 1, 0, 3 ]
+    trials = []
+    for t in range(samples):
+        circ = RecordedCircuit(width)
+        trials.append([circ.prefix(len(circ)) for d in generate_layers(width, depth, circ, gateSequence)])
+    return trials
+
+def generate_recorded_circuit(width, depth, trial, seed=0):
+    """One trial of `generate_recorded_circuits` at one depth, generated in memory.
+
+    The random gates are seeded by `seed`, `trial` and `width` only, so every process asking for
+    the same trial gets the same circuit, and the circuit at a smaller depth is a prefix of the one
+    at a larger depth, as with the files of `generate_circuits(width, width)`.
+    """
+    gateSequence = [ 0, 3, 2, 1, 2, 1, 0, 3 ]
+    # The coupler rotation carries over between trials of `width` layers each.
+    shift = (trial * width) % len(gateSequence)
+    gateSequence = gateSequence[shift:] + gateSequence[:shift]
+
+    state = random.getstate()
+    random.seed(f"{seed}:{trial}:{width}")
+    try:
+        circ = RecordedCircuit(width)
+        for _ in generate_layers(width, depth, circ, gateSequence):
+            pass
+    finally:
+        random.setstate(state)
+    return circ
+
+if __name__ == "__main__":
+    if not os.path.exists("heat_map_circuits"):
+       os.makedirs("heat_map_circuits")
+
+    for n in widths:
+        generate_circuits(n, n)
@@ -3,8 +3,16 @@ import csv
 import os
 import time
 from pathlib import Path
+
+from qrack_autotune import load_profile
+
+# The tuned paging settings of this host must be in the environment before Qrack is loaded.
+load_profile()
+
 from pyqrack import QrackSimulator, QrackCircuit
 
+from heat_map_circuit_generation import generate_recorded_circuit
+
 def create_csv(filename):
     file_exists = os.path.isfile(filename)
     csvfile = open(filename, 'a')
@@ -26,17 +34,23 @@ def write_csv(writer, data):
 @click.option('--depth', default=36, help='Which depth to run (for trial and width')
 @click.option('--sdrp', default=80, help='SDRP level setting for this case')
 @click.option('--out', default='heat_map_data.csv', help='Where to store the CSV output of each test')
-def bench(trial, width, depth, sdrp, out):
+@click.option('--seed', default=0, help='Seed of the generated circuits (the same trial, width and seed give the same circuit)')
+@click.option('--from-file', is_flag=True, help='Load the circuit from heat_map_circuits/ instead of generating it in memory')
+def bench(trial, width, depth, sdrp, out, seed, from_file):
     sdrp = sdrp * 0.0125
     circ = QrackCircuit()
 
-    path = "heat_map_circuits/trial_" + str(int(trial)) + "_w" + str(int(width)) + "_d" + str(int(depth))
-    my_file = Path(path)
-    if not my_file.is_file():
-        return
+    if from_file:
+        path = "heat_map_circuits/trial_" + str(int(trial)) + "_w" + str(int(width)) + "_d" + str(int(depth))
+        my_file = Path(path)
+        if not my_file.is_file():
+            return
 
-    # Load circuit definition from file
-    circ.in_from_file(path)
+        # Load circuit definition from file
+        circ.in_from_file(path)
+    else:
+        # Generate the circuit in memory and replay it into Qrack, so workers share no files.
+        generate_recorded_circuit(width, depth, trial, seed).run(circ)
 
     sim = QrackSimulator(width)
     if sdrp > 0:
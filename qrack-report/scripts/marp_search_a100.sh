@@ -1,15 +1,21 @@
-# Expect to be able to use about 1-to-2 GB less than the total GPU VRAM
-export QRACK_MAX_ALLOC_MB=79872
-# This is >64 GB of general RAM "heap" for simulation, excluding operating system load.
-export QRACK_MAX_PAGING_QB=33
-# For FP32 precision, an A100 can do 31 qb in a single "page." (16 GB).
-# Most or all NVIDIA GPUs have 4 "segments," so we can do 4 "pages."
-# This is 33 qb in total, for "naive Schrödinger method."
-export QRACK_MAX_CPU_QB=33
-# Because GPUs can't generally handle the memory fragmentation multiple max-footprint pages,
-# (31 qb being max for a page or segment, for the NVIDIA A100,)
-# we instead do 8 pages of 30 qb, (still 33 qb in total).
-export QRACK_MAX_PAGE_QB=30
+# Use the profile written by `python qrack_autotune.py tune` on this host, if there is one.
+PROFILE="$(dirname "$0")/qrack_profiles/$(hostname).env"
+if [ -f "$PROFILE" ]; then
+    source "$PROFILE"
+else
+    # Expect to be able to use about 1-to-2 GB less than the total GPU VRAM
+    export QRACK_MAX_ALLOC_MB=79872
+    # This is >64 GB of general RAM "heap" for simulation, excluding operating system load.
+    export QRACK_MAX_PAGING_QB=33
+    # For FP32 precision, an A100 can do 31 qb in a single "page." (16 GB).
+    # Most or all NVIDIA GPUs have 4 "segments," so we can do 4 "pages."
+    # This is 33 qb in total, for "naive Schrödinger method."
+    export QRACK_MAX_CPU_QB=33
+    # Because GPUs can't generally handle the memory fragmentation multiple max-footprint pages,
+    # (31 qb being max for a page or segment, for the NVIDIA A100,)
+    # we instead do 8 pages of 30 qb, (still 33 qb in total).
+    export QRACK_MAX_PAGE_QB=30
+fi
 for i in {1..100}; do
     ./benchmarks --optimal-single --single --max-qubits=54 --benchmark-depth=4 test_noisy_fidelity_2qb_nn_estimate
 done >> test_noisy_fidelity_2qb_nn_estimate_m4.txt
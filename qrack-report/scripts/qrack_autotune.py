@@ -0,0 +1,226 @@
+"""Autotuner for Qrack's paging and allocation environment variables.
+
+`marp_search_a100.sh` sets `QRACK_MAX_ALLOC_MB`, `QRACK_MAX_PAGING_QB`, `QRACK_MAX_CPU_QB` and
+`QRACK_MAX_PAGE_QB` by hand for one 80 GB A100. This script derives the capacity limits from the
+memory of the machine it runs on, times representative circuits (layered heat map circuits from
+`heat_map_circuit_generation.py` and a GHZ + QFT circuit like the QFT scripts) for each candidate
+page size and allocation budget, and writes the fastest setting to a profile for this host:
+
+    python qrack_autotune.py tune --width 24 --depth 12
+
+The profile is saved as `qrack_profiles/<hostname>.json`, with the measurements of every trial, and
+as `qrack_profiles/<hostname>.env` for shell drivers. `heat_map_generation.py` loads it with
+`load_profile()` before importing pyqrack, and `marp_search_a100.sh` sources the `.env` file when
+it exists. Variables that are already set in the environment take precedence over the profile.
+
+Qrack reads these variables when the library is loaded and when simulators are created, so each
+trial runs in a fresh process.
+"""
+import json
+import math
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import click
+
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qrack_profiles")
+
+ENV_VARS = ["QRACK_MAX_ALLOC_MB", "QRACK_MAX_PAGING_QB", "QRACK_MAX_CPU_QB", "QRACK_MAX_PAGE_QB"]
+BENCHMARKS = ["heat_map", "qft"]
+
+
+def profile_path(host: Optional[str] = None, extension: str = "json") -> str:
+    return os.path.join(PROFILE_DIR, f"{host or socket.gethostname()}.{extension}")
+
+
+def load_profile(path: Optional[str] = None) -> Dict[str, str]:
+    """Set the tuned Qrack environment variables of this host, unless they are already set.
+
+    Call this before importing pyqrack. Does nothing if the host has no profile.
+
+    Returns:
+        The variables set by the profile.
+    """
+    path = path or profile_path()
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        env = json.load(f)["env"]
+    for key, value in env.items():
+        os.environ.setdefault(key, str(value))
+    return env
+
+
+def memory_mb() -> int:
+    """Physical memory of this machine, in MB."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1 << 20)
+
+
+def capacity_env(alloc_mb: int) -> Dict[str, int]:
+    """Allocation budget and the largest state vector that fits in it, as in `marp_search_a100.sh`."""
+    # QRACK_FPPOW is log2 of the bits of a real number (5 for fp32), and an amplitude is two reals.
+    amplitude_bytes = 2 * (1 << int(os.environ.get("QRACK_FPPOW", 5))) // 8
+    max_qb = int(math.log2(alloc_mb * (1 << 20) // amplitude_bytes))
+    return {"QRACK_MAX_ALLOC_MB": alloc_mb, "QRACK_MAX_PAGING_QB": max_qb, "QRACK_MAX_CPU_QB": max_qb}
+
+
+def run_trial(env: Dict[str, int], benchmark: str, width: int, depth: int, repeats: int,
+              opencl: bool, timeout: float) -> dict:
+    """Time a benchmark in a fresh process with the given Qrack environment variables."""
+    child_env = dict(os.environ)
+    for key in ENV_VARS:
+        child_env.pop(key, None)
+    child_env.update({key: str(value) for key, value in env.items()})
+    args = [sys.executable, os.path.abspath(__file__), "trial", "--benchmark", benchmark,
+            "--width", str(width), "--depth", str(depth), "--repeats", str(repeats)]
+    if opencl:
+        args.append("--opencl")
+
+    result = {"env": env, "benchmark": benchmark, "width": width, "depth": depth}
+    try:
+        process = subprocess.run(args, env=child_env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {**result, "error": f"timed out after {timeout} s"}
+    if process.returncode != 0:
+        return {**result, "error": (process.stderr.strip().splitlines() or [f"exit code {process.returncode}"])[-1]}
+    return {**result, **json.loads(process.stdout.strip().splitlines()[-1])}
+
+
+def best_trial(trials: List[dict]) -> Optional[dict]:
+    """Setting with the highest total throughput over all benchmarks, among settings that never failed.
+
+    Ties go to the setting with the lowest peak RSS.
+    """
+    by_setting = {}
+    for trial in trials:
+        by_setting.setdefault(json.dumps(trial["env"], sort_keys=True), []).append(trial)
+    scores = []
+    for key, setting_trials in by_setting.items():
+        if any("error" in trial for trial in setting_trials):
+            continue
+        seconds = sum(trial["seconds"] for trial in setting_trials)
+        peak_rss_mb = max(trial["peak_rss_mb"] for trial in setting_trials)
+        scores.append((seconds, peak_rss_mb, key))
+    if not scores:
+        return None
+    seconds, peak_rss_mb, key = min(scores)
+    return {"env": json.loads(key), "seconds": seconds, "peak_rss_mb": peak_rss_mb}
+
+
+def save_profile(profile: dict, host: Optional[str] = None) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(profile_path(host), "w") as f:
+        json.dump(profile, f, indent=2)
+    with open(profile_path(host, "env"), "w") as f:
+        f.write(f"# Tuned by qrack_autotune.py on {profile['created']}.\n")
+        for key, value in profile["env"].items():
+            f.write(f"export {key}=${{{key}:-{value}}}\n")
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option("--width", default=24, help="Width of the benchmark circuits")
+@click.option("--depth", default=12, help="Depth of the heat map benchmark circuits")
+@click.option("--repeats", default=3, help="Number of circuits per benchmark and setting")
+@click.option("--page-qb", "page_qbs", multiple=True, type=int,
+              help="Candidate QRACK_MAX_PAGE_QB values (default: from width - 8 to width)")
+@click.option("--alloc-fraction", "alloc_fractions", multiple=True, type=float, default=[0.9], show_default=True,
+              help="Candidate fractions of physical memory for QRACK_MAX_ALLOC_MB")
+@click.option("--opencl/--no-opencl", default=False, help="Let Qrack use OpenCL devices")
+@click.option("--timeout", default=600.0, help="Timeout of a single trial, in seconds")
+def tune(width, depth, repeats, page_qbs, alloc_fractions, opencl, timeout):
+    """Sweep the Qrack paging settings on this machine and save the fastest as its profile."""
+    total_mb = memory_mb()
+    page_qbs = page_qbs or range(max(width - 8, 1), width + 1)
+
+    trials = []
+    for fraction in alloc_fractions:
+        capacity = capacity_env(int(fraction * total_mb))
+        if capacity["QRACK_MAX_PAGING_QB"] < width:
+            print(f"Skipping allocation fraction {fraction}: {width} qubits do not fit.")
+            continue
+        for page_qb in page_qbs:
+            env = {**capacity, "QRACK_MAX_PAGE_QB": min(page_qb, capacity["QRACK_MAX_PAGING_QB"])}
+            for benchmark in BENCHMARKS:
+                trial = run_trial(env, benchmark, width, depth, repeats, opencl, timeout)
+                trials.append(trial)
+                if "error" in trial:
+                    print(f"{env} {benchmark}: {trial['error']}")
+                else:
+                    print(f"{env} {benchmark}: {trial['seconds']:.3f} s, "
+                          f"{trial['circuits_per_second']:.3f} circuits/s, peak RSS {trial['peak_rss_mb']:.0f} MB")
+
+    best = best_trial(trials)
+    if best is None:
+        raise click.ClickException("Every setting failed, so no profile was written.")
+    profile = {
+        "host": socket.gethostname(),
+        "created": time.asctime(),
+        "cpu_count": os.cpu_count(),
+        "memory_mb": total_mb,
+        "opencl": opencl,
+        "env": best["env"],
+        "seconds": best["seconds"],
+        "peak_rss_mb": best["peak_rss_mb"],
+        "trials": trials,
+    }
+    save_profile(profile)
+    print(f"Saved {best['env']} to {profile_path()}")
+
+
+@cli.command()
+@click.option("--benchmark", type=click.Choice(BENCHMARKS), required=True)
+@click.option("--width", default=24)
+@click.option("--depth", default=12)
+@click.option("--repeats", default=3)
+@click.option("--opencl/--no-opencl", default=False)
+def trial(benchmark, width, depth, repeats, opencl):
+    """Run one benchmark with the Qrack environment of this process, printing its metrics as JSON."""
+    import random
+
+    from pyqrack import QrackCircuit, QrackSimulator
+
+    import heat_map_circuit_generation
+
+    # Skip the layers that avoid a full state vector, so that paging is what gets timed.
+    options = dict(isTensorNetwork=False, isSchmidtDecomposeMulti=False, isSchmidtDecompose=False,
+                   isStabilizerHybrid=False, isOpenCL=opencl)
+
+    seconds = 0.0
+    for _ in range(repeats):
+        if benchmark == "heat_map":
+            circ = QrackCircuit()
+            for _ in heat_map_circuit_generation.generate_layers(width, depth, circ, [0, 3, 2, 1, 2, 1, 0, 3]):
+                pass
+            sim = QrackSimulator(width, **options)
+            start = time.perf_counter()
+            circ.run(sim)
+        else:
+            # GHZ state followed by a QFT, as in the QFT scripts, from a random first-qubit rotation.
+            sim = QrackSimulator(width, **options)
+            start = time.perf_counter()
+            sim.u(0, random.uniform(0, math.pi), random.uniform(0, 2 * math.pi), 0)
+            for q in range(1, width):
+                sim.mcx([0], q)
+            sim.qft(list(range(width)))
+        sim.prob(0)
+        seconds += time.perf_counter() - start
+        del sim
+
+    # ru_maxrss is in kB on Linux.
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "circuits_per_second": repeats / seconds, "peak_rss_mb": peak_rss_mb}))
+
+
+if __name__ == "__main__":
+    cli()